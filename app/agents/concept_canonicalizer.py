@@ -1,17 +1,18 @@
 # app/agents/concept_canonicalizer.py
 from __future__ import annotations
 import re
+from functools import lru_cache
 from typing import Optional, Tuple
 
+_DIACRITICS = str.maketrans("óáéíú", "oaeiu")
+_NON_WORD_RE = re.compile(r"[^\w]+")  # spaces, hyphens, slashes, dots
+
 # Normalize surface (lower, strip punctuation/spaces/diacritics-lite)
 def _norm(s: str) -> str:
-    s = (s or "").lower().strip()
-    s = s.replace("ó","o").replace("á","a").replace("é","e").replace("í","i").replace("ú","u")
-    s = re.sub(r"[^\w]+", "", s)  # drop spaces, hyphens, slashes, dots
-    return s
+    return _NON_WORD_RE.sub("", (s or "").lower().strip().translate(_DIACRITICS))
 
 # Seed cross-lingual aliases → canonical concept_key (use a stable English key when possible)
-_ALIASES = {
+_RAW_ALIASES = {
     # Private Equity
     "irr": "IRR", "tir": "IRR", "tri": "IRR",
     "tvpi": "TVPI",
@@ -37,7 +38,10 @@ _ALIASES = {
     "priips": "PRIIPs",
     "kid": "KID",
 }
+# Keys run through _norm once so lookups never disagree with runtime normalization
+_ALIASES = {_norm(k): v for k, v in _RAW_ALIASES.items()}
 
+@lru_cache(maxsize=4096)
 def to_canonical(term: str) -> Tuple[str, bool]:
     """
     Returns (concept_key, is_known). If unknown, uses the raw surface as key.
@@ -45,10 +49,12 @@ def to_canonical(term: str) -> Tuple[str, bool]:
     k = _norm(term)
     if not k:
         return term, False
-    if k in _ALIASES:
-        return _ALIASES[k], True
+    ck = _ALIASES.get(k)
+    if ck:
+        return ck, True
+    t = term.strip()
     # If it looks like an acronym (2–6 upper letters), use that as canonical
-    if re.fullmatch(r"[A-Za-z]{2,6}", term.strip()) and term.isupper():
-        return term.strip(), True
+    if 2 <= len(t) <= 6 and t.isascii() and t.isalpha() and t.isupper():
+        return t, True
     # Fallback: return the visible surface as the key
-    return term.strip(), False
+    return t, False
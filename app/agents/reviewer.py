@@ -0,0 +1,17 @@
+from __future__ import annotations
+from ..prompts.composer import compose_review, load_template
+from ..services.llm import llm_parse
+from ..qa.types import ReviewMerged
+from ..config import settings
+
+async def review_and_merge(*, src_lang: str, tgt_lang: str, domain: str,
+                           glossary_block: str, source: str, current: str) -> str:
+    """
+    Adequacy + fluency + editor in a single call (MT_FUSED_REVIEW).
+    Falls back to `current` if the model returns an empty revision.
+    """
+    tpl = load_template("review.j2")
+    prompt = compose_review(tpl, src_lang=src_lang, tgt_lang=tgt_lang, domain=domain,
+                            glossary_block=glossary_block, source=source, current=current)
+    parsed = await llm_parse(prompt, model=settings.model_review, schema=ReviewMerged, temperature=0.2)
+    return (parsed.revised or current).strip()
@@ -1,6 +1,9 @@
 from __future__ import annotations
-import langid
-from ..domain.taxonomy import normalize_domain, DOMAINS
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from langid.langid import LanguageIdentifier, model as _langid_model
+from ..domain.taxonomy import normalize_domain, keyword_domain, DOMAINS
 from ..services.llm import llm_text
 from ..config import settings
 
@@ -9,21 +12,56 @@ DOMAIN_PROMPT = lambda txt: (
     f"{', '.join(DOMAINS)}. Answer with the label ONLY.\n\nTEXT:\n{txt[:2000]}"
 )
 
-def detect_lang(text: str) -> str:
+# decide_domain LLM fallback memo: (model, blake2b(text sent to the model)) -> label.
+# The label is a pure function of that text at temperature 0; duplicate requests skip the call
+# even when the persistent LLM response cache (MT_LLM_CACHE) is off.
+_DOMAIN_MEMO_MAX = 1024
+_domain_memo: "OrderedDict[tuple, str]" = OrderedDict()
+
+SUPPORTED_LANGS = ("en", "es", "fr", "de")
+LID_MAX_CHARS = 2048  # language ID saturates quickly; no need to scan the whole text
+
+@lru_cache(maxsize=1)
+def _identifier() -> LanguageIdentifier:
+    """
+    Lazily build the full langid identifier (all languages: text outside SUPPORTED_LANGS
+    must not be forced into one of them; it falls back to "es" in _detect_head).
+    norm_probs=False: only the argmax is used, so the probability normalisation is skipped.
+    """
+    return LanguageIdentifier.from_modelstring(_langid_model, norm_probs=False)
+
+@lru_cache(maxsize=4096)
+def _detect_head(head: str) -> str:
     try:
-        lang, _ = langid.classify(text)
-        if lang in {"en","es","fr","de"}:
+        lang, _ = _identifier().classify(head)
+        if lang in SUPPORTED_LANGS:
             return lang
     except Exception:
         pass
     # fallback simple
     return "es"
 
+def detect_lang(text: str) -> str:
+    # memoized on the classified prefix itself (retries/duplicate inputs skip langid)
+    return _detect_head((text or "")[:LID_MAX_CHARS])
+
 async def decide_domain(text: str, hint: str | None) -> str:
     if hint:
         dom = normalize_domain(hint)
         if dom:
             return dom
-    out = await llm_text(DOMAIN_PROMPT(text), model=settings.model_classify, temperature=0.0)
-    clean = normalize_domain(out.strip())
-    return clean or "Wealth Management"
+    dom = keyword_domain(text)
+    if dom:
+        return dom
+    prompt = DOMAIN_PROMPT(text)
+    key = (settings.model_classify, hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest())
+    hit = _domain_memo.get(key)
+    if hit is not None:
+        _domain_memo.move_to_end(key)
+        return hit
+    out = await llm_text(prompt, model=settings.model_classify, temperature=0.0)
+    clean = normalize_domain(out.strip()) or "Wealth Management"
+    _domain_memo[key] = clean
+    while len(_domain_memo) > _DOMAIN_MEMO_MAX:
+        _domain_memo.popitem(last=False)
+    return clean
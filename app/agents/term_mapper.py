@@ -1,49 +1,51 @@
 from __future__ import annotations
 import re
-from typing import List, Set
-from ..stores.rag_store import RAGStore
+from typing import Dict, FrozenSet, Iterable, List
+from ..stores.rag_store import rag_store
 from ..config import settings
 from .term_extractor import extract_terms_llm
 
 # Regex: acrónimos y ProperCase >=4
 CAND_RE = re.compile(r"\b([A-Z]{2,6}|[A-Z][a-zA-Z]{3,})\b")
-STOP = {"and","or","the","for","with","from","into","over","under","between","without",
-        "del","de","la","el","los","las","des","le","les","von","und","der","die","das"}
+STOP = frozenset({"and","or","the","for","with","from","into","over","under","between","without",
+                  "del","de","la","el","los","las","des","le","les","von","und","der","die","das"})
 
-BOOST = {"IRR","NAV","TVPI","DPI","MOIC","FX","AIFMD","ELTIF","UCITS","MiFID","PRIIPs","KID"}
+BOOST = frozenset({"IRR","NAV","TVPI","DPI","MOIC","FX","AIFMD","ELTIF","UCITS","MiFID","PRIIPs","KID"})
+_BOOST_SORTED = sorted(BOOST)
 
 def _regex_candidates(text: str) -> List[str]:
-    cands: Set[str] = set()
-    for m in CAND_RE.finditer(text or ""):
-        tok = (m.group(1) or "").strip()
-        if tok and tok.lower() not in STOP:
-            cands.add(tok)
-    return sorted(cands | BOOST)
+    """Regex hits in the text (STOP words dropped), sorted like the baseline union."""
+    return sorted({m.group(1) for m in CAND_RE.finditer(text or "") if m.group(1).lower() not in STOP})
 
-def _filter_unknown(terms: List[str], known_terms: List[str]) -> List[str]:
-    known = set((k or "").lower() for k in known_terms if k)
-    out: List[str] = []
-    seen: Set[str] = set()
+def _add_unknown(out: Dict[str, str], terms: Iterable[str], known: FrozenSet[str], limit: int | None) -> bool:
+    """
+    Streams `terms` into `out` (lowered key -> first surface seen), skipping known and
+    duplicate terms. Returns True as soon as `limit` candidates are collected (None: no cap).
+    """
     for t in terms:
         k = t.lower().strip()
-        if not k or k in seen: 
+        if not k or k in known or k in out:
             continue
-        if k in known: 
-            continue
-        seen.add(k)
-        out.append(t)
-    return out
+        out[k] = t
+        if limit is not None and len(out) >= limit:
+            return True
+    return False
 
 async def find_candidates_hybrid(text: str, known_terms: List[str], domain: str) -> List[str]:
-    regex_terms = _regex_candidates(text)
-    llm_terms: List[str] = []
-    if settings.llm_term_extractor_enabled:
+    known = frozenset(k.lower() for k in known_terms if k)
+    limit = settings.term_cand_topk
+    out: Dict[str, str] = {}
+    # topk applies to real hits (text + LLM); only when the text alone fills it is the LLM call skipped
+    full = _add_unknown(out, _regex_candidates(text), known, limit)
+    if not full and settings.llm_term_extractor_enabled:
         try:
             llm_terms = await extract_terms_llm(text, domain=domain)
         except Exception:
             llm_terms = []
-    merged = regex_terms + llm_terms
-    return _filter_unknown(merged, known_terms)[: settings.term_cand_topk]
+        _add_unknown(out, llm_terms, known, limit)
+    # BOOST vocabulary is always proposed, outside the topk budget
+    _add_unknown(out, _BOOST_SORTED, known, None)
+    return list(out.values())
 
 async def enrich_terms(terms: List[str], domain: str, client_id: str | None) -> int:
-    return await RAGStore().web_backfill(terms, domain, client_id)
+    return await rag_store().web_backfill(terms, domain, client_id)
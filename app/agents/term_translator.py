@@ -1,7 +1,10 @@
 # app/agents/term_translator.py
 from __future__ import annotations
+import asyncio
+from typing import Dict, List
 from pydantic import BaseModel, Field
 from ..services.llm import llm_parse
+from ..services.term_cache import term_cache
 from ..config import settings
 
 class TermProposal(BaseModel):
@@ -10,6 +13,16 @@ class TermProposal(BaseModel):
     tgt_lang: str
     proposal: str = Field(..., description="One preferred, publication-ready target form")
 
+class LangProposal(BaseModel):
+    lang: str
+    proposal: str = Field(..., description="One preferred, publication-ready target form")
+
+class MultiTermProposal(BaseModel):
+    """One term proposed for several target languages (list instead of dict: strict JSON schemas)."""
+    term: str
+    src_lang: str
+    proposals: List[LangProposal] = Field(default_factory=list)
+
 _PROMPT = """You are a financial terminology adapter.
 Given a SOURCE term in {src} and a TARGET language {tgt}, output ONE preferred target-language form.
 
@@ -19,7 +32,11 @@ Rules:
 - Return JSON only: {{"term":"{term}", "src_lang":"{src}", "tgt_lang":"{tgt}", "proposal":"..."}}
 """
 
-async def propose_term(term: str, src_lang: str, tgt_lang: str) -> str:
+async def propose_term(term: str, src_lang: str, tgt_lang: str, use_cache: bool = True) -> str:
+    # la caché sólo se lee aquí; las propuestas se guardan cuando el juez las acepta (glossary_resolver)
+    cached = await term_cache().get_many(term, src_lang, [tgt_lang]) if use_cache else {}
+    if tgt_lang in cached:
+        return cached[tgt_lang]
     out: TermProposal = await llm_parse(
         _PROMPT.format(term=term[:120], src=src_lang, tgt=tgt_lang),
         model=settings.model_review,
@@ -27,3 +44,46 @@ async def propose_term(term: str, src_lang: str, tgt_lang: str) -> str:
         temperature=0.0,
     )
     return out.proposal.strip()
+
+_MULTI_PROMPT = """You are a financial terminology adapter.
+Given a SOURCE term in {src}, output ONE preferred form for EACH target language in: {tgts}.
+
+Rules:
+- If an established acronym exists in a target language, prefer 'Long form (ACRONYM)' for first mention.
+- Use industry-standard casing/diacritics. No extra notes.
+- Return JSON only: {{"term":"{term}", "src_lang":"{src}", "proposals":[{{"lang":"<code>", "proposal":"..."}}]}}
+"""
+
+async def propose_term_multi(term: str, src_lang: str, tgt_langs: List[str],
+                             use_cache: bool = True) -> Dict[str, str]:
+    """
+    Proposes preferred forms for all target languages in a single LLM call.
+    Cached languages are skipped unless use_cache=False (retry after a weak judge);
+    languages the model skips fall back to one propose_term call each.
+    Nothing is written to the term cache here.
+    """
+    if not tgt_langs:
+        return {}
+    cached = await term_cache().get_many(term, src_lang, tgt_langs) if use_cache else {}
+    tgt_langs = [L for L in tgt_langs if L not in cached]
+    if not tgt_langs:
+        return cached
+    out: MultiTermProposal = await llm_parse(
+        _MULTI_PROMPT.format(term=term[:120], src=src_lang, tgts=", ".join(tgt_langs)),
+        model=settings.model_review,
+        schema=MultiTermProposal,
+        temperature=0.0,
+    )
+    wanted = set(tgt_langs)
+    res: Dict[str, str] = {}
+    for p in out.proposals:
+        lang = (p.lang or "").strip().lower()
+        prop = (p.proposal or "").strip()
+        if lang in wanted and prop and lang not in res:
+            res[lang] = prop
+
+    missing = [L for L in tgt_langs if L not in res]
+    if missing:
+        props = await asyncio.gather(*[propose_term(term, src_lang, L, use_cache) for L in missing])
+        res.update(zip(missing, props))
+    return {**cached, **res}
@@ -1,14 +1,13 @@
 from __future__ import annotations
 from typing import List
-from importlib import resources
-from ..prompts.composer import compose_translator
+from ..prompts.composer import compose_translator, load_template
 from ..services.llm import llm_text
 from ..config import settings
 
 async def translate_text(*, src_lang: str, tgt_lang: str, domain: str,
                          style: str, glossary_block: str, dnt: List[str],
                          rag_snippets: List[str], source: str) -> str:
-    tpl = resources.files("app.prompts.templates").joinpath("translator.j2").read_text(encoding="utf-8")
+    tpl = load_template("translator.j2")
     prompt = compose_translator(tpl, src_lang=src_lang, tgt_lang=tgt_lang, domain=domain,
                                 style=style, glossary_block=glossary_block, dnt=dnt,
                                 rag_snippets=rag_snippets, source=source)
@@ -28,14 +28,30 @@ class Settings(BaseSettings):
     qa_use_llm: bool = Field(default=False, alias="MT_QA_USE_LLM")
     qa_llm_model: str = Field(default="gpt-4o-mini", alias="MT_QA_LLM_MODEL")
     qa_weight_llm: float = Field(default=0.6, alias="MT_QA_WEIGHT_LLM")  # mezcla LLM vs reglas
+    fused_review: bool = Field(default=False, alias="MT_FUSED_REVIEW")  # adequacy+fluency+editor en 1 llamada
 
 
     # Concurrencia
     max_conc_translate: int = Field(default=6, alias="MT_MAX_CONCURRENCY_TRANSLATE")
     max_conc_embed: int     = Field(default=4, alias="MT_MAX_CONCURRENCY_EMBED")
+    max_conc_search: int    = Field(default=4, alias="MT_MAX_CONCURRENCY_SEARCH")
+    max_conc_fetch: int     = Field(default=8, alias="MT_MAX_CONCURRENCY_FETCH")
+    max_conc_segments: int  = Field(default=8, alias="MT_MAX_CONCURRENCY_SEGMENTS")
     # Rate limits (aiolimiter)
     llm_rps: float = Field(default=4.0, alias="MT_LLM_RPS")
     embed_rps: float = Field(default=2.0, alias="MT_EMBED_RPS")
+    # Overrides por modelo, p.ej. "gpt-4o-mini=8,gpt-4o=2"; el resto usa llm_rps
+    llm_model_rps: str = Field(default="", alias="MT_LLM_MODEL_RPS")
+    # Cliente HTTP de OpenAI (pool compartido por LLM y embeddings)
+    http2: bool = Field(default=True, alias="MT_HTTP2")
+    http_max_connections: int = Field(default=256, alias="MT_HTTP_MAX_CONNECTIONS")
+    http_max_keepalive: int = Field(default=128, alias="MT_HTTP_MAX_KEEPALIVE")
+    http_timeout_s: float = Field(default=60.0, alias="MT_HTTP_TIMEOUT_S")
+
+    # Caché exacta de respuestas LLM (solo llamadas con temperature=0). Opt-in: activada, las
+    # peticiones repetidas devuelven la salida guardada y no vuelven a ejercitar el modelo.
+    llm_cache_enabled: bool = Field(default=False, alias="MT_LLM_CACHE")
+    llm_cache_ttl_s: int = Field(default=86400, alias="MT_LLM_CACHE_TTL_S")
 
     # SQLite
     db_path: str = Field(default=".local/mt.sqlite", alias="MT_DB_PATH")
@@ -44,8 +60,12 @@ class Settings(BaseSettings):
     # RAG/TM
     rag_topk: int = Field(default=3, alias="MT_RAG_TOPK")
     tm_topk: int  = Field(default=1, alias="MT_TM_TOPK")
+    rag_cache_ttl_s: float = Field(default=300.0, alias="MT_RAG_CACHE_TTL_S")  # 0 = sin caché de retrieve
+    embed_store_dtype: str = Field(default="float16", alias="MT_EMBED_STORE_DTYPE")  # float16 | int8 | float32 en disco
 
     term_quality_min: float = Field(default=0.75, alias="MT_TERM_QUALITY_MIN")
+    term_cache_enabled: bool = Field(default=True, alias="MT_TERM_CACHE")  # caché persistente de propuestas
+    skip_judge_for_known: bool = Field(default=True, alias="MT_SKIP_JUDGE_KNOWN")  # alias conocido → sin juez LLM
         # --- NUEVO: control de extractor/validadores LLM y trazas ---
     llm_term_extractor_enabled: bool = Field(default=True, alias="MT_LLM_TERM_EXTRACTOR")
     term_cand_topk: int = Field(default=12, alias="MT_TERM_CAND_TOPK")
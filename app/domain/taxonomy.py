@@ -1,3 +1,6 @@
+import re
+from typing import Optional
+
 DOMAINS = ["Private Equity", "Real Estate", "Fiscal/Tax", "Wealth Management"]
 
 STYLE_GUIDE = (
@@ -7,15 +10,47 @@ STYLE_GUIDE = (
     "Avoid calques; prefer established industry phrasing. Honor do-not-translate list."
 )
 
+_DOMAINS_LOWER = {d.lower(): d for d in DOMAINS}
+# Substring fallbacks, checked in order
+_LABEL_KEYWORDS = (
+    ("equity", "Private Equity"),
+    ("estate", "Real Estate"), ("rics", "Real Estate"), ("cap rate", "Real Estate"),
+    ("tax", "Fiscal/Tax"), ("vat", "Fiscal/Tax"), ("withholding", "Fiscal/Tax"), ("fiscal", "Fiscal/Tax"),
+)
+
 def normalize_domain(label: str) -> str:
     label = (label or "").strip().lower()
-    for d in DOMAINS:
-        if d.lower() == label:
-            return d
-    if "equity" in label:
-        return "Private Equity"
-    if "estate" in label or "rics" in label or "cap rate" in label:
-        return "Real Estate"
-    if "tax" in label or "vat" in label or "withholding" in label or "fiscal" in label:
-        return "Fiscal/Tax"
+    dom = _DOMAINS_LOWER.get(label)
+    if dom:
+        return dom
+    for kw, dom in _LABEL_KEYWORDS:
+        if kw in label:
+            return dom
     return "Wealth Management"
+
+# Cheap keyword signals per domain, used before asking the LLM to classify.
+# Only domain-specific cues: generic words (tax, fiscal, carry, gp, kid, ter...) show up across domains.
+DOMAIN_KEYWORDS = {
+    "Private Equity": re.compile(
+        r"\b(private equity|buyouts?|carried interest|vintage year|capital calls?|dry powder|irr|tvpi|dpi|moic"
+        r"|general partners?|limited partners?|lps)\b", re.I),
+    "Real Estate": re.compile(
+        r"\b(real estate|reits?|cap rate|noi|wault|rics|ltv|dscr|leases?|tenants?|rent roll)\b", re.I),
+    "Fiscal/Tax": re.compile(
+        r"\b(vat|tva|mwst|withholding|transfer pricing|beps|tax treat(?:y|ies)|double taxation"
+        r"|permanent establishment|tax residen(?:ce|cy|ts?))\b", re.I),
+    "Wealth Management": re.compile(
+        r"\b(ucits|mifid|priips?|key information document|sharpe ratio|total expense ratio|wealth management"
+        r"|discretionary mandates?|retail investors?)\b", re.I),
+}
+
+def keyword_domain(text: str, margin: int = 2, max_chars: int = 4000) -> Optional[str]:
+    """
+    Returns the domain whose distinct keyword cues lead the runner-up by at least `margin`,
+    or None when the signal is ambiguous. Repeating one cue does not add up.
+    """
+    head = (text or "")[:max_chars]
+    scores = sorted(((len({m.lower() for m in rx.findall(head)}), dom) for dom, rx in DOMAIN_KEYWORDS.items()),
+                    reverse=True)
+    (best, dom), (second, _) = scores[0], scores[1]
+    return dom if best - second >= margin else None
@@ -4,16 +4,29 @@ import logging, asyncio
 from typing import Dict, List, Optional
 from ..agents.term_mapper import find_candidates_hybrid
 from ..agents.concept_canonicalizer import to_canonical
-from ..agents.term_translator import propose_term
-from ..qa.term_quality import judge_term_quality
-from ..stores.term_store import TermStore, GlossaryItem
-from ..stores.rag_store import RAGStore
+from ..agents.term_translator import propose_term_multi
+from ..qa.term_quality import judge_term_quality_multi
+from ..stores.term_store import TermStore, GlossaryItem, term_store
+from ..stores.rag_store import RAGStore, rag_store
+from ..services.llm import get_llm_semaphore
+from ..services.term_cache import term_cache
 from ..config import settings
 
 log = logging.getLogger(__name__)
 ALL_LANGS = ("en", "es", "fr", "de")
 
-async def _ensure_lang_pref(
+async def _judge(source_surface: str, src_lang: str, concept_key: str,
+                 proposals: Dict[str, str]) -> Dict[str, float]:
+    confs: Dict[str, float] = {}
+    if settings.skip_judge_for_known:
+        # a proposal that is itself a seeded alias of this concept needs no judge
+        confs = {L: 1.0 for L, p in proposals.items() if to_canonical(p) == (concept_key, True)}
+    to_judge = {L: p for L, p in proposals.items() if L not in confs}
+    if to_judge:
+        confs.update(await judge_term_quality_multi(source_surface, src_lang, to_judge))
+    return confs
+
+async def ensure_concept_prefs(
     ts: TermStore,
     rag: RAGStore,
     *,
@@ -22,36 +35,51 @@ async def _ensure_lang_pref(
     concept_key: str,
     source_surface: str,
     src_lang: str,
-    tgt_lang: str,
+    tgt_langs: List[str],
     enable_rag: bool
-) -> str:
+) -> Dict[str, str]:
     # 1) lookup in store (fuzzy on ck/variants)
-    existing = await ts.find_preferred_fuzzy(client_id, domain, tgt_lang, concept_key)
-    if existing:
-        return existing
+    found = await asyncio.gather(*[
+        ts.find_preferred_fuzzy(client_id, domain, L, concept_key) for L in tgt_langs
+    ])
+    prefs: Dict[str, str] = {L: pref for L, pref in zip(tgt_langs, found) if pref}
+    missing = [L for L in tgt_langs if L not in prefs]
+    if not missing:
+        return prefs
 
-    # 2) propose (src→tgt), QA
-    proposal = await propose_term(source_surface, src_lang, tgt_lang)
-    conf = await judge_term_quality(source_surface, src_lang, tgt_lang, proposal)
+    # 2) propose (src→all missing targets) + QA, one call each
+    proposals = await propose_term_multi(source_surface, src_lang, missing)
+    confs = await _judge(source_surface, src_lang, concept_key, proposals)
 
-    # 3) if weak, enrich with RAG and retry once
-    if conf < getattr(settings, "term_quality_min", 0.75) and enable_rag:
+    # 3) if weak, enrich with RAG and retry once for the weak languages only
+    min_q = getattr(settings, "term_quality_min", 0.75)
+    weak = [L for L in missing if confs.get(L, 0.0) < min_q]
+    if weak and enable_rag:
         try:
             await rag.web_backfill([source_surface, concept_key], domain=domain, client_id=client_id)
         except Exception:
             pass
-        proposal = await propose_term(source_surface, src_lang, tgt_lang)
-        conf = await judge_term_quality(source_surface, src_lang, tgt_lang, proposal)
+        # sin caché: la propuesta cacheada sería la misma que acaba de rechazarse
+        retried = await propose_term_multi(source_surface, src_lang, weak, use_cache=False)
+        proposals.update(retried)
+        confs.update(await _judge(source_surface, src_lang, concept_key, retried))
+        still_weak = [L for L in weak if confs.get(L, 0.0) < min_q]
+        if still_weak:
+            log.info("term.weak", extra={"concept_key": concept_key, "langs": still_weak})
 
-    # 4) persist
-    await ts.upsert_preferred(GlossaryItem(
-        client_id=client_id,
-        domain=domain,
-        concept_key=concept_key,
-        lang=tgt_lang,
-        preferred=proposal
-    ))
-    return proposal
+    # 4) persist (only judged-good proposals are shared through the term cache)
+    await term_cache().set_many(source_surface, src_lang,
+                                {L: proposals[L] for L in missing if confs.get(L, 0.0) >= min_q})
+    for L in missing:
+        await ts.upsert_preferred(GlossaryItem(
+            client_id=client_id,
+            domain=domain,
+            concept_key=concept_key,
+            lang=L,
+            preferred=proposals[L]
+        ))
+        prefs[L] = proposals[L]
+    return prefs
 
 async def resolve_glossary_for_targets(
     *,
@@ -67,11 +95,12 @@ async def resolve_glossary_for_targets(
     Returns {tgt_lang: glossary_block_string}. Internally it:
       - extracts candidate terms (language-agnostic)
       - canonicalizes to a single concept_key across languages
-      - ensures preferred in ALL 4 languages (en/es/fr/de) so the glossary is cross-linked
+      - ensures preferred in ALL 4 languages (en/es/fr/de) so the glossary is cross-linked,
+        with one batched propose + judge call per concept
       - returns a per-target block forcing the translator to use those forms
     """
-    ts = TermStore()
-    rag = RAGStore()
+    ts = term_store()
+    rag = rag_store()
 
     # discover candidates in the *source language*
     cands = await find_candidates_hybrid(source_text, known_terms=[], domain=domain)
@@ -88,23 +117,23 @@ async def resolve_glossary_for_targets(
     langs_to_fill = set(ALL_LANGS) if fill_all_four_langs else set(targets) | {src_lang}
     results_per_lang: Dict[str, Dict[str, str]] = {L: {} for L in ALL_LANGS}
 
-    sem = asyncio.Semaphore(6)
+    sem = get_llm_semaphore()  # shared across requests
 
-    async def fill_for_lang(ck: str, surface_src: str, L: str):
+    async def fill_for_concept(ck: str, surface_src: str):
         async with sem:
-            pref = await _ensure_lang_pref(
+            prefs = await ensure_concept_prefs(
                 ts, rag,
                 client_id=client_id, domain=domain,
                 concept_key=ck, source_surface=surface_src,
-                src_lang=src_lang, tgt_lang=L,
+                src_lang=src_lang, tgt_langs=sorted(langs_to_fill),
                 enable_rag=enable_rag
             )
+        for L, pref in prefs.items():
             results_per_lang[L][ck] = pref
 
     await asyncio.gather(*[
-        fill_for_lang(ck, surface, L)
+        fill_for_concept(ck, surface)
         for ck, surface in concepts.items()
-        for L in langs_to_fill
     ])
 
     # Persisting is already done; now build the per-target glossary blocks
@@ -1,67 +1,51 @@
 from __future__ import annotations
 import asyncio, re
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 
 from ..agents.router import detect_lang, decide_domain
 from ..domain.taxonomy import STYLE_GUIDE
-from ..stores.term_store import TermStore
-from ..stores.rag_store import RAGStore
-from ..stores.tm_store import TMStore
+from ..stores.term_store import term_store
+from ..stores.rag_store import rag_store
+from ..stores.tm_store import tm_store
 from ..agents.translator import translate_text
 from ..agents.adequacy_reviewer import adequacy_review
 from ..agents.fluency_reviewer import fluency_review
 from ..agents.editor import edit_merge
+from ..agents.reviewer import review_and_merge
 from ..config import settings
+from ..utils.segments import split_segments
 
 # QA (reglas + LLM híbrido)
 from ..qa.validators import (
     numeric_consistency,
+    number_set,
     terminology_coverage,
     domain_alignment_score,
-    anumeric_consistency,          # LLM numeric QA (async)
-    adomain_alignment_score,       # LLM domain QA (async)
+    aqa_audit,                     # LLM numeric + domain QA (async, en paralelo)
 )
 
-def split_segments(text: str, max_chars: int = 1400) -> List[str]:
-    parts = re.split(r"\n\s*\n|\r\n\r\n", (text or "").strip())
-    segs: List[str] = []
-    for p in parts:
-        p = p.strip()
-        if not p:
-            continue
-        if len(p) <= max_chars:
-            segs.append(p)
-        else:
-            sents = re.split(r"(?<=[\.\!\?])\s+", p)
-            buf = ""
-            for s in sents:
-                if len(buf) + len(s) + 1 <= max_chars:
-                    buf = (buf + " " + s).strip()
-                else:
-                    if buf:
-                        segs.append(buf)
-                    buf = s
-            if buf:
-                segs.append(buf)
-    return segs
+_ACRO_RE = re.compile(r"\b[A-Z]{2,6}\b")
+
 
 async def _rag_for(text: str, domain: str, client_id: str) -> List[str]:
-    rag = RAGStore()
+    rag = rag_store()
     await rag.load_seed_sources()
     snippets = await rag.retrieve(text[:2000], domain, client_id, topk=settings.rag_topk)
     if not snippets:
         # backfill web con acrónimos si el corpus está vacío
-        acros = sorted(set(re.findall(r"\b[A-Z]{2,6}\b", text)))[:6]
+        acros = sorted(set(_ACRO_RE.findall(text)))[:6]
         await rag.web_backfill_if_empty(acros or ["IRR", "NAV", "MiFID", "UCITS"], domain, client_id)
         snippets = await rag.retrieve(text[:2000], domain, client_id, topk=settings.rag_topk)
     return snippets
 
-async def _tm_hint(client_id: str, src_lang: str, tgt_lang: str, segment: str) -> Optional[str]:
-    tm = TMStore()
-    hits = await tm.search(client_id, src_text=segment, src_lang=src_lang, tgt_lang=tgt_lang, topk=settings.tm_topk)
-    if hits and hits[0][1] > 0.92:
-        return hits[0][0]
-    return None
+async def _tm_hints(client_id: str, src_lang: str, tgt_lang: str, segments: List[str],
+                    seg_vecs: Optional[np.ndarray] = None) -> List[Optional[str]]:
+    # una sola búsqueda TM por idioma para todos los segmentos
+    tm = tm_store()
+    hits = await tm.search_many(client_id, segments, src_lang=src_lang, tgt_lang=tgt_lang, topk=settings.tm_topk,
+                                src_vecs=seg_vecs)
+    return [h[0][0] if h and h[0][1] > 0.92 else None for h in hits]
 
 async def run_pipeline(
     *,
@@ -80,24 +64,27 @@ async def run_pipeline(
     domain = domain_override or await decide_domain(text, hint=None)
 
     # 2) Contexto: DNT + glosarios + RAG
-    ts = TermStore()
-    dnt = await ts.dnt_list(client_id)
-    gl_blocks: Dict[str, str] = {}
-    gl_maps: Dict[str, Dict[str, str]] = {}
-    for L in targets:
-        block, m = await ts.glossary_block(client_id, L)
-        gl_blocks[L] = block
-        gl_maps[L] = m
-
-    rag_snips = await _rag_for(text, domain, client_id) if enable_rag else []
+    ts = term_store()
+    # fuentes independientes: se consultan en paralelo
+    dnt, fetched, rag_snips = await asyncio.gather(
+        ts.dnt_list(client_id),
+        ts.glossary_blocks_multi(client_id, domain, targets),
+        _rag_for(text, domain, client_id) if enable_rag else asyncio.sleep(0, result=[]),
+    )
+    gl_blocks: Dict[str, str] = {L: fetched[L][0] for L in targets}
+    gl_maps: Dict[str, Dict[str, str]] = {L: fetched[L][1] for L in targets}
+
     segs = split_segments(text)
 
     results: Dict[str, Dict] = {}
+    src_nums = number_set(text)  # same for every target language
+    tm_rows: List[Tuple[str, str, str, str]] = []  # (tgt_lang, domain, src, tgt)
 
-    async def process_lang(tgt_lang: str):
-        translated_segs: List[str] = []
-        for seg in segs:
-            hint = await _tm_hint(client_id, src_lang, tgt_lang, seg)
+    sem = asyncio.Semaphore(settings.max_conc_segments)  # segmentos en vuelo, entre idiomas
+    seg_vecs = await tm_store().embed(segs) if segs else None  # embeddings de origen, compartidos entre idiomas
+
+    async def process_seg(tgt_lang: str, seg: str, hint: Optional[str]) -> str:
+        async with sem:
             if hint:
                 base = hint
             else:
@@ -111,6 +98,16 @@ async def run_pipeline(
                     rag_snippets=rag_snips,
                     source=seg,
                 )
+            if settings.fused_review:
+                # revisión + edición en una sola llamada
+                return await review_and_merge(
+                    src_lang=src_lang,
+                    tgt_lang=tgt_lang,
+                    domain=domain,
+                    glossary_block=gl_blocks[tgt_lang],
+                    source=seg,
+                    current=base,
+                )
             # reviewers en paralelo
             ade, flu = await asyncio.gather(
                 adequacy_review(
@@ -123,23 +120,28 @@ async def run_pipeline(
                 ),
                 fluency_review(tgt_lang=tgt_lang, domain=domain, current=base),
             )
-            final_seg = await edit_merge(
+            return await edit_merge(
                 tgt_lang=tgt_lang,
                 domain=domain,
                 adequacy_text=(ade.revised or base),
                 fluency_text=(flu.revised or base),
             )
-            translated_segs.append(final_seg)
-            if save_tm:
-                await TMStore().upsert(client_id, src_lang, tgt_lang, domain, seg, final_seg)
+
+    async def process_lang(tgt_lang: str):
+        # segmentos independientes: gather conserva el orden
+        hints = await _tm_hints(client_id, src_lang, tgt_lang, segs, seg_vecs)
+        translated_segs = await asyncio.gather(*[
+            process_seg(tgt_lang, seg, hint) for seg, hint in zip(segs, hints)
+        ])
+        if save_tm:
+            tm_rows.extend((tgt_lang, domain, seg, final_seg) for seg, final_seg in zip(segs, translated_segs))
 
         # 3) QA híbrido (reglas + LLM opcional)
         full = "\n\n".join(translated_segs)
         if settings.qa_use_llm:
-            num = await anumeric_consistency(text, full)
-            doms = await adomain_alignment_score(domain, full)
+            num, doms = await aqa_audit(text, full, domain, src_nums=src_nums)
         else:
-            num = numeric_consistency(text, full)
+            num = numeric_consistency(text, full, src_nums=src_nums)
             doms = domain_alignment_score(domain, full)
         cov = terminology_coverage(full, gl_maps[tgt_lang])
 
@@ -156,6 +158,10 @@ async def run_pipeline(
     for L, data in zip(targets, outs):
         results[L] = data
 
+    # TM: una sola escritura por lotes al final (visible para la siguiente petición)
+    if tm_rows:
+        await tm_store().upsert_many(client_id, src_lang, tm_rows)
+
     return {
         "src_lang": src_lang,
         "domain": domain,
@@ -1,30 +1,51 @@
 from __future__ import annotations
-from jinja2 import Environment, BaseLoader
+from functools import lru_cache
+from importlib import resources
+from jinja2 import Environment, BaseLoader, Template
 from typing import List
 
 _env = Environment(loader=BaseLoader(), autoescape=False, trim_blocks=True, lstrip_blocks=True)
 
+@lru_cache(maxsize=64)
+def _compile(src: str) -> Template:
+    return _env.from_string(src)
+
 def render_template(src: str, **kwargs) -> str:
-    return _env.from_string(src).render(**kwargs)
+    return _compile(src).render(**kwargs)
+
+@lru_cache(maxsize=None)
+def load_template(name: str) -> Template:
+    """
+    Read and compile a packaged template once; later calls reuse the parsed Template.
+    """
+    src = resources.files("app.prompts.templates").joinpath(name).read_text(encoding="utf-8")
+    return _compile(src)
 
-def compose_translator(tpl: str, *, src_lang: str, tgt_lang: str, domain: str,
+def compose_translator(tpl: Template, *, src_lang: str, tgt_lang: str, domain: str,
                        style: str, glossary_block: str, dnt: List[str],
                        rag_snippets: List[str], source: str) -> str:
-    return render_template(
-        tpl, src_lang=src_lang, tgt_lang=tgt_lang, domain=domain, style=style,
+    return tpl.render(
+        src_lang=src_lang, tgt_lang=tgt_lang, domain=domain, style=style,
         glossary_block=glossary_block, dnt=dnt, rag_snippets=rag_snippets, source=source
     )
 
-def compose_adequacy(tpl: str, *, src_lang: str, tgt_lang: str, domain: str,
+def compose_adequacy(tpl: Template, *, src_lang: str, tgt_lang: str, domain: str,
                      glossary_block: str, source: str, current: str) -> str:
-    return render_template(
-        tpl, src_lang=src_lang, tgt_lang=tgt_lang, domain=domain,
+    return tpl.render(
+        src_lang=src_lang, tgt_lang=tgt_lang, domain=domain,
         glossary_block=glossary_block, source=source, current=current
     )
 
-def compose_fluency(tpl: str, *, tgt_lang: str, domain: str, current: str) -> str:
-    return render_template(tpl, tgt_lang=tgt_lang, domain=domain, current=current)
+def compose_fluency(tpl: Template, *, tgt_lang: str, domain: str, current: str) -> str:
+    return tpl.render(tgt_lang=tgt_lang, domain=domain, current=current)
+
+def compose_editor(tpl: Template, *, tgt_lang: str, domain: str, adequacy_text: str, fluency_text: str) -> str:
+    return tpl.render(tgt_lang=tgt_lang, domain=domain,
+                      adequacy_text=adequacy_text, fluency_text=fluency_text)
 
-def compose_editor(tpl: str, *, tgt_lang: str, domain: str, adequacy_text: str, fluency_text: str) -> str:
-    return render_template(tpl, tgt_lang=tgt_lang, domain=domain,
-                           adequacy_text=adequacy_text, fluency_text=fluency_text)
+def compose_review(tpl: Template, *, src_lang: str, tgt_lang: str, domain: str,
+                   glossary_block: str, source: str, current: str) -> str:
+    return tpl.render(
+        src_lang=src_lang, tgt_lang=tgt_lang, domain=domain,
+        glossary_block=glossary_block, source=source, current=current
+    )
@@ -1,6 +1,7 @@
 # app/qa/term_quality.py
 from __future__ import annotations
-from typing import List
+import asyncio
+from typing import Dict, List
 from pydantic import BaseModel, Field
 from ..services.llm import llm_parse
 from ..config import settings
@@ -10,10 +11,18 @@ class TermQuality(BaseModel):
     confidence: float = Field(..., ge=0, le=1)
     reasons: List[str] = []
 
+class LangTermQuality(BaseModel):
+    lang: str
+    ok: bool
+    confidence: float = Field(..., ge=0, le=1)
+
+class MultiTermQuality(BaseModel):
+    results: List[LangTermQuality] = Field(default_factory=list)
+
 _PROMPT = """You are a financial term auditor.
 Judge if TARGET is an appropriate preferred form for SOURCE (in SOURCE_LANG) when translated to TARGET_LANG.
 
-Return JSON: {"ok": true/false, "confidence": 0..1, "reasons": ["..."]}
+Return JSON: {{"ok": true/false, "confidence": 0..1, "reasons": ["..."]}}
 
 SOURCE: {source}
 SOURCE_LANG: {src_lang}
@@ -29,3 +38,42 @@ async def judge_term_quality(source: str, src_lang: str, target_lang: str, targe
         temperature=0.0,
     )
     return float(max(0.0, min(1.0, out.confidence)))
+
+_MULTI_PROMPT = """You are a financial term auditor.
+For each TARGET below, judge if it is an appropriate preferred form for SOURCE (in SOURCE_LANG) in that target language.
+
+Return JSON: {{"results": [{{"lang": "<code>", "ok": true/false, "confidence": 0..1}}]}}
+
+SOURCE: {source}
+SOURCE_LANG: {src_lang}
+TARGETS:
+{targets}
+"""
+
+async def judge_term_quality_multi(source: str, src_lang: str, proposals: Dict[str, str]) -> Dict[str, float]:
+    """
+    Judges every {lang: proposal} in one LLM call. Returns {lang: confidence};
+    languages missing from the answer are judged individually.
+    """
+    if not proposals:
+        return {}
+    targets = "\n".join(f"- {lang}: {prop[:200]}" for lang, prop in proposals.items())
+    out: MultiTermQuality = await llm_parse(
+        _MULTI_PROMPT.format(source=source[:120], src_lang=src_lang, targets=targets),
+        model=settings.qa_llm_model,
+        schema=MultiTermQuality,
+        temperature=0.0,
+    )
+    res: Dict[str, float] = {}
+    for r in out.results:
+        lang = (r.lang or "").strip().lower()
+        if lang in proposals and lang not in res:
+            res[lang] = float(max(0.0, min(1.0, r.confidence)))
+
+    missing = [L for L in proposals if L not in res]
+    if missing:
+        confs = await asyncio.gather(*[
+            judge_term_quality(source, src_lang, L, proposals[L]) for L in missing
+        ])
+        res.update(zip(missing, confs))
+    return res
@@ -10,6 +10,11 @@ class FluencyOut(BaseModel):
     revised: str = ""
     notes: str = ""
 
+class ReviewMerged(BaseModel):
+    revised: str = ""
+    adequacy_notes: str = ""
+    fluency_notes: str = ""
+
 class QAStats(BaseModel):
     term_coverage: float = 0.0
     numeric_consistency: float = 0.0
@@ -1,7 +1,8 @@
 # app/qa/validators.py
 from __future__ import annotations
 import re
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
 from pydantic import BaseModel, Field
 
 # ---------------------------------------------------------------------------
@@ -47,6 +48,10 @@ def extract_numbers(text: str) -> List[str]:
     """Devuelve los tokens numéricos relevantes tal como aparecen en el texto."""
     return [m.group(0).strip() for m in NUM_RE.finditer(text or "")]
 
+_NON_NUMERIC_RE = re.compile(r"[^\d,.\-]")
+_DROP_SEPARATORS = str.maketrans("", "", ".,")
+
+@lru_cache(maxsize=8192)
 def normalize_number_token(tok: str) -> str:
     """
     Normaliza para comparar entre idiomas:
@@ -69,31 +74,41 @@ def normalize_number_token(tok: str) -> str:
         s = s[1:].strip()
 
     has_pct = "%" in s
-    # moneda y multiplicadores
-    s = s.replace("€", "").replace("$", "").replace("£", "")
-    s = s.replace("×", "x")
-    s = re.sub(r"\b(k|m|b|bn|mm)\b", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\bx\b", "", s, flags=re.IGNORECASE)
-
-    # deja solo dígitos, coma, punto y signo
-    core = re.sub(r"[^\d,.\-]", "", s)
-    # unifica separadores (quita miles y separadores ambiguos)
-    core = core.replace(".", "").replace(",", "").replace(" ", "")
+    # deja solo dígitos, coma, punto y signo: moneda, sufijos (k/m/b/bn/mm), 'x' y
+    # espacios caen en la misma pasada; luego se unifican separadores (miles/ambiguos)
+    core = _NON_NUMERIC_RE.sub("", s).translate(_DROP_SEPARATORS)
     if not core:
         return ""
     if neg and not core.startswith("-"):
         core = "-" + core
     return (core + "%") if has_pct else core
 
-def numeric_consistency(src: str, tgt: str) -> float:
+def number_set(text: str) -> Set[str]:
+    """Magnitudes normalizadas presentes en el texto."""
+    return set(filter(None, (normalize_number_token(x) for x in extract_numbers(text))))
+
+def numeric_consistency(src: str, tgt: str, src_nums: Optional[Set[str]] = None) -> float:
     """
     Porcentaje de cantidades del SOURCE que aparecen en TARGET con la misma magnitud.
+    `src_nums` (de number_set) evita re-extraer el SOURCE al validar varios idiomas.
     """
-    s = set(filter(None, (normalize_number_token(x) for x in extract_numbers(src))))
+    s = number_set(src) if src_nums is None else src_nums
     if not s:
         return 1.0
-    t = set(filter(None, (normalize_number_token(x) for x in extract_numbers(tgt))))
-    return len(s & t) / len(s) if s else 1.0
+    if not tgt:
+        return 0.0
+    # set & set ya itera sobre el conjunto menor
+    return len(s & number_set(tgt)) / len(s)
+
+@lru_cache(maxsize=256)
+def _term_counts(terms: tuple) -> tuple:
+    # términos distintos en minúsculas -> nº de conceptos que los usan (varios conceptos pueden compartir forma)
+    counts: Dict[str, int] = {}
+    for term in terms:
+        if term:
+            low = term.lower()
+            counts[low] = counts.get(low, 0) + 1
+    return tuple(counts.items())
 
 def terminology_coverage(text: str, pref_map: Dict[str, str]) -> float:
     """
@@ -102,43 +117,46 @@ def terminology_coverage(text: str, pref_map: Dict[str, str]) -> float:
     if not pref_map:
         return 1.0
     total = len(pref_map)
-    if total == 0:
-        return 1.0
-    hits = 0
     low = text.lower()
-    for _, term in pref_map.items():
-        if term and term.lower() in low:
-            hits += 1
+    hits = sum(n for term, n in _term_counts(tuple(pref_map.values())) if term in low)
     return hits / total
 
+_DOMAIN_CUES: Dict[str, List[str]] = {
+    "Private Equity": [
+        r"\bnav\b",
+        r"\b(ir{1,2}|internal rate of return|tir)\b",
+        r"\btvpi\b", r"\bdpi\b", r"\bmoic\b", r"\bdry powder\b",
+        r"\bcapital call(s)?\b", r"\bdistribution(s)?\b",
+        r"\bfund(s)?\b", r"\bportfolio revaluation\b",
+    ],
+    "Real Estate": [
+        r"\bcap rate\b", r"\blease(s)?\b", r"\bnoi\b",
+        r"\bltv\b", r"\bdscr\b", r"\bwault\b", r"\brent roll\b",
+        r"\bvaluation\b",
+    ],
+    "Fiscal/Tax": [
+        r"\bwithholding\b", r"\bvat\b", r"\btreat(y|ies)\b",
+        r"\bcfc\b", r"\bbeps\b", r"\btransfer pricing\b",
+        r"\bpermanent establishment\b",
+    ],
+    "Wealth Management": [
+        r"\bmifid\b", r"\bucits\b", r"\bter\b",
+        r"\bsharpe\b", r"\bportfolio\b", r"\bkid\b", r"\bpriip(s)?\b",
+    ],
+}
+# Una alternancia compilada por dominio; cada patrón va en su grupo con nombre (p0, p1, ...)
+# para contar patrones distintos encontrados en una sola pasada.
+_DOMAIN_RE: Dict[str, "re.Pattern[str]"] = {
+    dom: re.compile("|".join(f"(?P<p{i}>{p})" for i, p in enumerate(pats)))
+    for dom, pats in _DOMAIN_CUES.items()
+}
+
 def domain_alignment_score(domain: str, text: str) -> float:
     """Heurística con patrones amplios y sinónimos (baseline, rápida)."""
-    patterns = {
-        "Private Equity": [
-            r"\bnav\b",
-            r"\b(ir{1,2}|internal rate of return|tir)\b",
-            r"\btvpi\b", r"\bdpi\b", r"\bmoic\b", r"\bdry powder\b",
-            r"\bcapital call(s)?\b", r"\bdistribution(s)?\b",
-            r"\bfund(s)?\b", r"\bportfolio revaluation\b",
-        ],
-        "Real Estate": [
-            r"\bcap rate\b", r"\blease(s)?\b", r"\bnoi\b",
-            r"\bltv\b", r"\bdscr\b", r"\bwault\b", r"\brent roll\b",
-            r"\bvaluation\b",
-        ],
-        "Fiscal/Tax": [
-            r"\bwithholding\b", r"\bvat\b", r"\btreat(y|ies)\b",
-            r"\bcfc\b", r"\bbeps\b", r"\btransfer pricing\b",
-            r"\bpermanent establishment\b",
-        ],
-        "Wealth Management": [
-            r"\bmifid\b", r"\bucits\b", r"\bter\b",
-            r"\bsharpe\b", r"\bportfolio\b", r"\bkid\b", r"\bpriip(s)?\b",
-        ],
-    }
-    text_l = text.lower()
-    pats = patterns.get(domain, [])
-    hits = sum(1 for p in pats if re.search(p, text_l))
+    pat = _DOMAIN_RE.get(domain)
+    if pat is None:
+        return 0.5
+    hits = len({m.lastgroup for m in pat.finditer(text.lower())})
     # Base 0.5 + 0.1 por match (capado a 1.0)
     return min(1.0, 0.5 + 0.1 * hits)
 
@@ -149,6 +167,11 @@ def domain_alignment_score(domain: str, text: str) -> float:
 from ..config import settings
 from ..services.llm import llm_parse
 
+async def _referee(prompt: str, schema: type) -> BaseModel:
+    # sin memo propio: la única capa de caché es la de llm_parse (MT_LLM_CACHE)
+    model = getattr(settings, "qa_llm_model", settings.model_review)
+    return await llm_parse(prompt, model=model, schema=schema, temperature=0.0)
+
 # Estructuras de parseo tipado (Pydantic)
 class NumericAudit(BaseModel):
     ok: bool = Field(..., description="True si TODOS los valores y magnitudes coinciden entre SOURCE y TARGET (independiente del formato)")
@@ -200,22 +223,17 @@ TEXT:
 {text}
 """
 
-async def anumeric_consistency(src: str, tgt: str) -> float:
+async def anumeric_consistency(src: str, tgt: str, src_nums: Optional[Set[str]] = None) -> float:
     """
     Híbrido: si reglas dan 1.0 devolvemos 1.0. Si no, pedimos veredicto al LLM.
     Combinamos: score = min(1.0, (1-w)*rule + w*(0.5*matched_ratio + 0.5*confidence))
     """
-    rule = numeric_consistency(src, tgt)
+    rule = numeric_consistency(src, tgt, src_nums=src_nums)
     if rule >= 1.0:
         return 1.0
     try:
         prompt = NUMERIC_AUDIT_PROMPT.format(source=src[:4000], target=tgt[:4000])
-        audit: NumericAudit = await llm_parse(
-            prompt,
-            model=getattr(settings, "qa_llm_model", settings.model_review),
-            schema=NumericAudit,
-            temperature=0.0,
-        )
+        audit: NumericAudit = await _referee(prompt, NumericAudit)
         llm_score = 0.5 * float(audit.matched_ratio) + 0.5 * float(audit.confidence)
         w = float(getattr(settings, "qa_weight_llm", 0.6))
         return min(1.0, (1 - w) * rule + w * llm_score)
@@ -231,13 +249,56 @@ async def adomain_alignment_score(domain: str, text: str) -> float:
     rule = domain_alignment_score(domain, text)
     try:
         prompt = DOMAIN_AUDIT_PROMPT.format(domain=domain, text=text[:4000])
-        audit: DomainAudit = await llm_parse(
-            prompt,
-            model=getattr(settings, "qa_llm_model", settings.model_review),
-            schema=DomainAudit,
-            temperature=0.0,
-        )
+        audit: DomainAudit = await _referee(prompt, DomainAudit)
         w = float(getattr(settings, "qa_weight_llm", 0.6))
         return min(1.0, max(rule, (1 - w) * rule + w * float(audit.confidence)))
     except Exception:
         return rule
+
+class QAAudit(BaseModel):
+    numeric: NumericAudit
+    domain: DomainAudit
+
+QA_AUDIT_PROMPT = """Role: Financial Translation QA Referee and Domain Auditor.
+Answer BOTH parts in a single JSON object.
+
+Part "numeric": check that all QUANTITIES in SOURCE are preserved in TARGET.
+- Consider percentages, currencies (€, $, £), multipliers k/M/B/bn/mm, and 'x' multipliers (e.g., 1.8x).
+- Locale formatting changes and currency symbol position are allowed.
+- Units and magnitude MUST remain identical.
+Return: ok (true/false), matched_ratio (0..1), confidence (0..1), issues (short bullet points).
+
+Part "domain": decide if TARGET aligns with the domain "{domain}" (one of: Private Equity, Real Estate, Fiscal/Tax, Wealth Management).
+- Private Equity: NAV, IRR/TIR, TVPI, DPI, MOIC, capital calls, distributions, fund portfolio revaluation, dry powder.
+- Real Estate: cap rate, leases, NOI, LTV, DSCR, WAULT, rent roll, valuation specifics.
+- Fiscal/Tax: VAT, withholding, treaties, BEPS, transfer pricing, CFC, permanent establishment.
+- Wealth Management: UCITS, MiFID, KID/PRIIPs, portfolio metrics (TER, Sharpe), retail investor disclosures.
+Return: domain (repeated input domain), aligned (true/false), confidence (0..1), cues (specific tokens/phrases found).
+
+SOURCE:
+{source}
+
+TARGET:
+{target}
+"""
+
+async def aqa_audit(src: str, tgt: str, domain: str, src_nums: Optional[Set[str]] = None) -> Tuple[float, float]:
+    """
+    Un único referee LLM para números + dominio (comparte prompt y round-trip).
+    Si las reglas numéricas ya dan 1.0 sólo hace falta la auditoría de dominio.
+    Devuelve (numeric_consistency, domain_score) con las mismas fórmulas que las variantes sueltas.
+    """
+    num_rule = numeric_consistency(src, tgt, src_nums=src_nums)
+    if num_rule >= 1.0:
+        return 1.0, await adomain_alignment_score(domain, tgt)
+    dom_rule = domain_alignment_score(domain, tgt)
+    try:
+        prompt = QA_AUDIT_PROMPT.format(domain=domain, source=src[:4000], target=tgt[:4000])
+        audit: QAAudit = await _referee(prompt, QAAudit)
+    except Exception:
+        return num_rule, dom_rule
+    w = float(getattr(settings, "qa_weight_llm", 0.6))
+    llm_num = 0.5 * float(audit.numeric.matched_ratio) + 0.5 * float(audit.numeric.confidence)
+    num = min(1.0, (1 - w) * num_rule + w * llm_num)
+    doms = min(1.0, max(dom_rule, (1 - w) * dom_rule + w * float(audit.domain.confidence)))
+    return num, doms
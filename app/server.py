@@ -3,17 +3,18 @@ from __future__ import annotations
 import logging
 from typing import List, Dict, Optional, Literal
 
+import orjson
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, AliasChoices
 
 from .logging_conf import setup_logging
 from .pipelines.translate_pipeline import run_pipeline
-from .pipelines.translate_graph import run_pipeline_graph
-from .stores.term_store import TermStore, GlossaryItem, DNTItem
-from .stores.rag_store import RAGStore
-from .stores.tm_store import TMStore
+from .pipelines.translate_graph import run_pipeline_graph, run_pipeline_graph_stream
+from .stores.term_store import GlossaryItem, DNTItem, term_store
+from .stores.rag_store import rag_store
+from .stores.tm_store import tm_store
 
 # -----------------------------------------------------------------------------
 # App & logging
@@ -123,13 +124,43 @@ async def translate(req: TranslateRequest):
         logger.exception("/v1/translate failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/v1/translate/stream")
+async def translate_stream(req: TranslateRequest):
+    """
+    NDJSON stream (graph engine): one line per target language as it completes,
+    then a final "done" line with the full payload.
+    """
+    logger.info(
+        "translate stream request: client_id=%s targets=%s src_lang=%s domain=%s enable_rag=%s save_tm=%s text_len=%d",
+        req.client_id, req.targets, req.src_lang, req.domain,
+        req.enable_rag, req.save_tm, len(req.text or ""),
+    )
+
+    async def lines():
+        try:
+            async for ev in run_pipeline_graph_stream(
+                text=req.text,
+                client_id=req.client_id,
+                targets=req.targets,
+                src_lang_override=req.src_lang,
+                domain_override=req.domain,
+                enable_rag=req.enable_rag,
+                save_tm=req.save_tm,
+            ):
+                yield orjson.dumps(ev, option=orjson.OPT_APPEND_NEWLINE)
+        except Exception as e:
+            logger.exception("/v1/translate/stream failed: %s", e)
+            yield orjson.dumps({"event": "error", "detail": str(e)}, option=orjson.OPT_APPEND_NEWLINE)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 # -----------------------------------------------------------------------------
 # Glossary management
 # -----------------------------------------------------------------------------
 @app.post("/v1/glossary/upsert")
 async def glossary_upsert(item: GlossaryUpsert):
     try:
-        ts = TermStore()
+        ts = term_store()
         await ts.upsert_preferred(
             GlossaryItem(
                 client_id=item.client_id,
@@ -148,7 +179,7 @@ async def glossary_upsert(item: GlossaryUpsert):
 @app.get("/v1/glossary/{client_id}/export")
 async def glossary_export(client_id: str):
     try:
-        ts = TermStore()
+        ts = term_store()
         data = await ts.export_client(client_id)
         return {"client_id": client_id, "glossary": data}
     except Exception as e:
@@ -161,7 +192,7 @@ async def glossary_export(client_id: str):
 @app.post("/v1/dnt/upsert")
 async def dnt_upsert(req: DNTUpsert):
     try:
-        ts = TermStore()
+        ts = term_store()
         for term in req.terms:
             await ts.add_dnt(DNTItem(client_id=req.client_id, term=term))
         return {"status": "ok", "count": len(req.terms)}
@@ -175,7 +206,7 @@ async def dnt_upsert(req: DNTUpsert):
 @app.post("/v1/rag/ingest")
 async def rag_ingest(req: RAGIngestRequest):
     try:
-        rag = RAGStore()
+        rag = rag_store()
         n = await rag.ingest_urls(req.urls, domain=req.domain, client_id=req.client_id)
         return {"status": "ok", "ingested": n}
     except Exception as e:
@@ -188,7 +219,7 @@ async def rag_ingest(req: RAGIngestRequest):
 @app.post("/v1/tm/clear")
 async def tm_clear(req: TMClearRequest):
     try:
-        tm = TMStore()
+        tm = tm_store()
         await tm.clear_client(req.client_id)
         return {"status": "ok"}
     except Exception as e:
@@ -1,20 +1,154 @@
 from __future__ import annotations
-from typing import List
+import asyncio
+from typing import Any, List, Optional, Set, Tuple
 import numpy as np
-from openai import AsyncOpenAI
 from ..config import settings
-from .llm import get_embed_limiter
+from .llm import client, get_embed_limiter
 
-_client = AsyncOpenAI()
+# Micro-batching: las llamadas concurrentes a embed_texts se agrupan en una sola petición
+_BATCH_MAX_INPUTS = 256
+_BATCH_WINDOW_S = 0.005
+_pending: List[Tuple[List[str], "asyncio.Future[np.ndarray]"]] = []
+_pending_n = 0
+_flush_timer: Optional[asyncio.TimerHandle] = None
+_inflight: Set["asyncio.Task[None]"] = set()
+
+async def _embed_call(inputs: List[str]) -> np.ndarray:
+    async with get_embed_limiter():
+        res = await client().embeddings.create(model=settings.model_embed, input=inputs)
+    return np.array([d.embedding for d in res.data], dtype="float32")
+
+async def _embed_alone(texts: List[str], fut: "asyncio.Future[np.ndarray]") -> None:
+    try:
+        vecs = await _embed_call(texts)
+    except Exception as e:
+        if not fut.done():
+            fut.set_exception(e)
+        return
+    if not fut.done():
+        fut.set_result(vecs)
+
+async def _embed_batch(batch: List[Tuple[List[str], "asyncio.Future[np.ndarray]"]]) -> None:
+    try:
+        vecs = await _embed_call([t for texts, _ in batch for t in texts])
+    except Exception as e:
+        if len(batch) == 1:
+            fut = batch[0][1]
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        # el lote mezcla llamadas de peticiones distintas: un error (entrada inválida, fallo puntual)
+        # no debe propagarse a todas; cada llamada se reintenta sola y recibe su propio resultado
+        await asyncio.gather(*(_embed_alone(texts, fut) for texts, fut in batch if not fut.done()))
+        return
+    i = 0
+    for texts, fut in batch:
+        if not fut.done():
+            fut.set_result(vecs[i:i + len(texts)])
+        i += len(texts)
+
+def _reset() -> List[Tuple[List[str], "asyncio.Future[np.ndarray]"]]:
+    global _pending, _pending_n, _flush_timer
+    if _flush_timer is not None:
+        _flush_timer.cancel()
+        _flush_timer = None
+    batch, _pending, _pending_n = _pending, [], 0
+    return batch
+
+def _flush() -> None:
+    batch = _reset()
+    if batch:
+        task = asyncio.ensure_future(_embed_batch(batch))
+        _inflight.add(task)
+        task.add_done_callback(_inflight.discard)
 
 async def embed_texts(texts: List[str]) -> np.ndarray:
+    global _pending_n, _flush_timer
     inputs = [t[:3000] for t in texts]
-    async with get_embed_limiter():
-        res = await _client.embeddings.create(model=settings.model_embed, input=inputs)
-    vecs = [d.embedding for d in res.data]
-    return np.array(vecs, dtype="float32")
-
-def cosine_sim(a: np.ndarray, b: np.ndarray) -> np.ndarray:
-    a_norm = a / (np.linalg.norm(a, axis=1, keepdims=True) + 1e-8)
-    b_norm = b / (np.linalg.norm(b, axis=1, keepdims=True) + 1e-8)
-    return np.dot(a_norm, b_norm.T)
+    loop = asyncio.get_running_loop()
+    if _pending and _pending[0][1].get_loop() is not loop:
+        _reset()  # restos de un event loop ya terminado (p.ej. asyncio.run sucesivos)
+    if _pending_n + len(inputs) > _BATCH_MAX_INPUTS:
+        _flush()
+    fut: "asyncio.Future[np.ndarray]" = loop.create_future()
+    _pending.append((inputs, fut))
+    _pending_n += len(inputs)
+    if _pending_n >= _BATCH_MAX_INPUTS:
+        _flush()
+    elif _flush_timer is None:
+        _flush_timer = loop.call_later(_BATCH_WINDOW_S, _flush)
+    return await fut
+
+def vec_to_blob(vec: np.ndarray) -> bytes:
+    """
+    Serializa un vector según settings.embed_store_dtype (la similitud se sigue calculando en float32):
+    - float16: 2 bytes/dim
+    - int8: 1 byte/dim + escala float32 por vector (simétrico, max|v| -> 127)
+    - float32: 4 bytes/dim
+    """
+    dtype = settings.embed_store_dtype
+    if dtype == "int8":
+        v = np.asarray(vec, dtype=np.float32)
+        scale = np.float32(np.abs(v).max() / 127.0) if v.size else np.float32(0.0)
+        q = np.round(v / scale).astype(np.int8) if scale > 0 else np.zeros(v.shape, dtype=np.int8)
+        return scale.tobytes() + q.tobytes()
+    if dtype == "float32":
+        return np.asarray(vec, dtype=np.float32).tobytes()
+    return np.asarray(vec, dtype=np.float16).tobytes()
+
+def vec_from_blob(blob: bytes, dim: int) -> np.ndarray:
+    # el formato se deduce del tamaño frente a la dimensión de la consulta,
+    # así conviven filas antiguas (float32) con las nuevas sin migrar el esquema
+    n = len(blob)
+    if n == 2 * dim:
+        return np.frombuffer(blob, dtype=np.float16)
+    if n == dim + 4:
+        scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+        return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+    return np.frombuffer(blob, dtype=np.float32)
+
+def stack_blobs(rows: List[Tuple[Any, bytes]], dim: int) -> Tuple[np.ndarray, List[Any]]:
+    """(payload, blob) -> matriz contigua float32 (N×dim) + payloads alineados; ignora filas sin vector."""
+    payloads = [p for p, blob in rows if blob]
+    blobs = [blob for _, blob in rows if blob]
+    sizes = {len(b) for b in blobs}
+    if len(sizes) == 1:
+        # caso habitual (un solo formato): un join y una única decodificación de todo el bloque;
+        # join sobre bytearray para que el buffer sea escribible y float32 no necesite otra copia
+        n, buf = sizes.pop(), bytearray().join(blobs)
+        if n == 2 * dim:
+            return np.frombuffer(buf, dtype=np.float16).reshape(-1, dim).astype(np.float32), payloads
+        if n == dim + 4:
+            rec = np.frombuffer(buf, dtype=np.dtype([("scale", "<f4"), ("q", "i1", (dim,))]))
+            return rec["q"].astype(np.float32) * rec["scale"][:, None], payloads
+        if n == 4 * dim:
+            return np.frombuffer(buf, dtype=np.float32).reshape(-1, dim), payloads
+    M = np.empty((len(payloads), dim), dtype=np.float32)
+    for i, blob in enumerate(blobs):
+        M[i] = vec_from_blob(blob, dim)
+    return M, payloads
+
+def unit_rows(M: np.ndarray) -> np.ndarray:
+    """Normaliza filas in place (mismo epsilon que cosine_sim) para usar cosine_sim(..., b_unit=True)."""
+    M /= (np.sqrt(np.einsum("ij,ij->i", M, M)) + 1e-8)[:, None]
+    return M
+
+def cosine_sim(a: np.ndarray, b: np.ndarray, b_unit: bool = False) -> np.ndarray:
+    # sin copias normalizadas de b (la matriz grande): un único matmul y se escala la salida (Q×N).
+    # b_unit=True: b ya viene normalizada (unit_rows), el kernel queda en un producto escalar
+    a = np.ascontiguousarray(a, dtype=np.float32)
+    b = np.ascontiguousarray(b, dtype=np.float32)
+    an = np.sqrt(np.einsum("ij,ij->i", a, a)) + 1e-8
+    sims = a @ b.T
+    sims /= an[:, None]
+    if not b_unit:
+        sims /= (np.sqrt(np.einsum("ij,ij->i", b, b)) + 1e-8)[None, :]
+    return sims
+
+def top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los k mayores de cada fila, en orden descendente: argpartition O(N) + sort de k."""
+    k = min(k, sims.shape[-1])
+    if k <= 0:
+        return np.empty(sims.shape[:-1] + (0,), dtype=np.intp)
+    part = np.argpartition(-sims, k - 1, axis=-1)[..., :k]
+    return np.take_along_axis(part, np.argsort(-np.take_along_axis(sims, part, axis=-1), axis=-1), axis=-1)
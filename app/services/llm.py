@@ -1,20 +1,30 @@
 # app/services/llm.py
 from __future__ import annotations
-import json, asyncio, logging
+import json, asyncio, importlib.util, logging, weakref
 from time import perf_counter
-from typing import Optional, Type, Any
+from typing import Dict, Optional, Type, Any
 from pydantic import BaseModel
+import httpx
+import orjson
 from aiolimiter import AsyncLimiter
 from openai import AsyncOpenAI
 from ..config import settings
 from ..telemetry import trace
+from .llm_cache import llm_cache, cache_key, cacheable
 
 _client: Optional[AsyncOpenAI] = None
 _llm_limiter = AsyncLimiter(settings.llm_rps, time_period=1)
+# One token bucket per model: the provider meters each model separately.
+_model_limiters: Dict[str, AsyncLimiter] = {}
 _embed_limiter = AsyncLimiter(settings.embed_rps, time_period=1)
+# Cap for LLM-bound fan-out (e.g. glossary fills) across concurrent requests, one per event loop
+# (an asyncio.Semaphore binds to the first loop that contends on it; tests/runners use several).
+# Acquired by dispatchers only; llm_text/llm_parse never take it, so nesting can't deadlock.
+_llm_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
 # Logging
 log = logging.getLogger(__name__)
+_INFO = logging.INFO
 MAX_LOG_CHARS = 1800  # cap logged prompt/response size to avoid huge logs
 
 def _snip(s: str | None, n: int = MAX_LOG_CHARS) -> str:
@@ -23,13 +33,72 @@ def _snip(s: str | None, n: int = MAX_LOG_CHARS) -> str:
     s = str(s)
     return s if len(s) <= n else (s[:n] + " …[truncated]")
 
+def _dumps(meta: Dict[str, Any]) -> str:
+    # orjson: UTF-8 nativo (equivale a ensure_ascii=False) y bastante más rápido que json.dumps
+    return orjson.dumps(meta, default=str).decode()
+
+def _wants_meta() -> bool:
+    # sin trazas ni INFO activos no se construyen metadatos/snippets (coste fijo por llamada)
+    return settings.trace_prompts or log.isEnabledFor(_INFO)
+
+def _emit(meta: Dict[str, Any]) -> None:
+    if settings.trace_prompts:
+        trace.log(**meta)
+    if log.isEnabledFor(_INFO):
+        log.info("%s", _dumps(meta))
+
+def _log_cache_hit(op: str, model: str, t0: float) -> None:
+    if _wants_meta():
+        _emit({
+            "kind": "llm.cache_hit",
+            "op": op,
+            "model": model,
+            "latency_ms": round((perf_counter() - t0) * 1000, 1),
+        })
+
+def _model_rps() -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in settings.llm_model_rps.split(","):
+        name, _, rps = part.partition("=")
+        if name.strip() and rps.strip():
+            out[name.strip()] = float(rps)
+    return out
+
+def get_model_limiter(model: str) -> AsyncLimiter:
+    """
+    Process-wide limiter for `model` (MT_LLM_MODEL_RPS override, else MT_LLM_RPS).
+    """
+    lim = _model_limiters.get(model)
+    if lim is None:
+        rps = _model_rps().get(model)
+        lim = _llm_limiter if rps is None else AsyncLimiter(rps, time_period=1)
+        _model_limiters[model] = lim
+    return lim
+
+def _use_http2() -> bool:
+    # httpx sólo admite HTTP/2 con el paquete h2 instalado (httpx[http2]); sin él, HTTP/1.1
+    if not settings.http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        log.warning("MT_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1")
+        return False
+    return True
+
 def client() -> AsyncOpenAI:
     """
     Lazy-initialize the OpenAI async client.
     """
     global _client
     if _client is None:
-        _client = AsyncOpenAI()
+        # pool amplio + HTTP/2: las ráfagas tras liberar el limiter se multiplexan sin re-handshakes
+        _client = AsyncOpenAI(http_client=httpx.AsyncClient(
+            http2=_use_http2(),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive,
+            ),
+            timeout=httpx.Timeout(settings.http_timeout_s, connect=5.0),
+        ))
     return _client
 
 async def llm_text(prompt: str, model: str, temperature: float = 0.0) -> str:
@@ -37,20 +106,25 @@ async def llm_text(prompt: str, model: str, temperature: float = 0.0) -> str:
     Fire-and-return text generation helper with rate limiting, JSON logs, and trace events.
     """
     t0 = perf_counter()
-    req_meta = {
-        "kind": "llm.request",
-        "op": "responses.create",
-        "model": model,
-        "temperature": temperature,
-        "prompt_len": len(prompt or ""),
-        "prompt_snip": _snip(prompt),
-    }
-    if settings.trace_prompts:
-        trace.log(**req_meta)
-    log.info(json.dumps(req_meta, ensure_ascii=False))
+    if _wants_meta():
+        _emit({
+            "kind": "llm.request",
+            "op": "responses.create",
+            "model": model,
+            "temperature": temperature,
+            "prompt_len": len(prompt or ""),
+            "prompt_snip": _snip(prompt),
+        })
+
+    key = cache_key(prompt, model, temperature, "text") if cacheable(temperature) else None
+    if key:
+        hit = await llm_cache().get(key)
+        if hit is not None:
+            _log_cache_hit("responses.create", model, t0)
+            return hit
 
     try:
-        async with _llm_limiter:
+        async with get_model_limiter(model):
             r = await client().responses.create(
                 model=model,
                 input=prompt,
@@ -63,20 +137,20 @@ async def llm_text(prompt: str, model: str, temperature: float = 0.0) -> str:
         rid = getattr(r, "id", None)
 
         t1 = perf_counter()
-        resp_meta = {
-            "kind": "llm.response",
-            "op": "responses.create",
-            "model": model,
-            "request_id": rid,
-            "latency_ms": round((t1 - t0) * 1000, 1),
-            "in_tokens": in_tok,
-            "out_tokens": out_tok,
-            "response_len": len(out_text),
-            "response_snip": _snip(out_text),
-        }
-        if settings.trace_prompts:
-            trace.log(**resp_meta)
-        log.info(json.dumps(resp_meta, ensure_ascii=False))
+        if _wants_meta():
+            _emit({
+                "kind": "llm.response",
+                "op": "responses.create",
+                "model": model,
+                "request_id": rid,
+                "latency_ms": round((t1 - t0) * 1000, 1),
+                "in_tokens": in_tok,
+                "out_tokens": out_tok,
+                "response_len": len(out_text),
+                "response_snip": _snip(out_text),
+            })
+        if key:
+            await llm_cache().set(key, out_text)
         return out_text
     except Exception as e:
         err_meta = {
@@ -87,7 +161,7 @@ async def llm_text(prompt: str, model: str, temperature: float = 0.0) -> str:
         }
         if settings.trace_prompts:
             trace.log(**err_meta)
-        log.exception(json.dumps(err_meta, ensure_ascii=False))
+        log.exception(_dumps(err_meta))
         raise
 
 async def llm_parse(prompt: str, model: str, schema: Type[BaseModel], temperature: float = 0.0) -> BaseModel:
@@ -95,21 +169,27 @@ async def llm_parse(prompt: str, model: str, schema: Type[BaseModel], temperatur
     Structured-parse helper (Pydantic schema) with rate limiting, JSON logs, and trace events.
     """
     t0 = perf_counter()
-    req_meta = {
-        "kind": "llm.request",
-        "op": "responses.parse",
-        "model": model,
-        "schema": getattr(schema, "__name__", str(schema)),
-        "temperature": temperature,
-        "prompt_len": len(prompt or ""),
-        "prompt_snip": _snip(prompt),
-    }
-    if settings.trace_prompts:
-        trace.log(**req_meta)
-    log.info(json.dumps(req_meta, ensure_ascii=False))
+    if _wants_meta():
+        _emit({
+            "kind": "llm.request",
+            "op": "responses.parse",
+            "model": model,
+            "schema": getattr(schema, "__name__", str(schema)),
+            "temperature": temperature,
+            "prompt_len": len(prompt or ""),
+            "prompt_snip": _snip(prompt),
+        })
+
+    kind = getattr(schema, "__name__", str(schema))
+    key = cache_key(prompt, model, temperature, kind) if cacheable(temperature) else None
+    if key:
+        hit = await llm_cache().get(key)
+        if hit is not None:
+            _log_cache_hit("responses.parse", model, t0)
+            return schema.model_validate_json(hit)
 
     try:
-        async with _llm_limiter:
+        async with get_model_limiter(model):
             r = await client().responses.parse(
                 model=model,
                 input=prompt,
@@ -125,20 +205,20 @@ async def llm_parse(prompt: str, model: str, schema: Type[BaseModel], temperatur
         rid = getattr(r, "id", None)
 
         t1 = perf_counter()
-        resp_meta = {
-            "kind": "llm.response",
-            "op": "responses.parse",
-            "model": model,
-            "request_id": rid,
-            "latency_ms": round((t1 - t0) * 1000, 1),
-            "in_tokens": in_tok,
-            "out_tokens": out_tok,
-            "parsed_type": type(parsed).__name__ if parsed is not None else None,
-            "raw_text_snip": _snip(out_text),
-        }
-        if settings.trace_prompts:
-            trace.log(**resp_meta)
-        log.info(json.dumps(resp_meta, ensure_ascii=False))
+        if _wants_meta():
+            _emit({
+                "kind": "llm.response",
+                "op": "responses.parse",
+                "model": model,
+                "request_id": rid,
+                "latency_ms": round((t1 - t0) * 1000, 1),
+                "in_tokens": in_tok,
+                "out_tokens": out_tok,
+                "parsed_type": type(parsed).__name__ if parsed is not None else None,
+                "raw_text_snip": _snip(out_text),
+            })
+        if key and parsed is not None:
+            await llm_cache().set(key, parsed.model_dump_json())
 
         return parsed  # pydantic instance
     except Exception as e:
@@ -151,7 +231,7 @@ async def llm_parse(prompt: str, model: str, schema: Type[BaseModel], temperatur
         }
         if settings.trace_prompts:
             trace.log(**err_meta)
-        log.exception(json.dumps(err_meta, ensure_ascii=False))
+        log.exception(_dumps(err_meta))
         raise
 
 def extract_json_obj(text: str) -> Any:
@@ -172,3 +252,14 @@ def extract_json_obj(text: str) -> Any:
 
 def get_embed_limiter() -> AsyncLimiter:
     return _embed_limiter
+
+def get_llm_limiter() -> AsyncLimiter:
+    return _llm_limiter
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Semaphore shared by all requests on the running loop (created lazily per loop)."""
+    loop = asyncio.get_running_loop()
+    sem = _llm_sems.get(loop)
+    if sem is None:
+        sem = _llm_sems[loop] = asyncio.Semaphore(settings.max_conc_translate)
+    return sem
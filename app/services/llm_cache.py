@@ -0,0 +1,66 @@
+# app/services/llm_cache.py
+from __future__ import annotations
+import asyncio, hashlib
+from time import time
+from typing import Optional
+from ..config import settings
+from ..stores.db import init_db
+
+INIT_SQL = """
+CREATE TABLE IF NOT EXISTS llm_cache(
+  key        TEXT PRIMARY KEY,
+  value      TEXT NOT NULL,
+  created_at REAL NOT NULL
+);
+"""
+
+def cache_key(prompt: str, model: str, temperature: float, kind: str) -> str:
+    """
+    Exact-match key over everything that determines the response.
+    `kind` is the schema name for parse calls or "text" for plain generations.
+    """
+    raw = f"{model}|{temperature}|{kind}|{prompt}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def cacheable(temperature: float) -> bool:
+    """
+    Only deterministic (temperature=0) calls are safe to replay, and only when the cache is
+    enabled: it is opt-in (MT_LLM_CACHE=1, off by default).
+    """
+    return settings.llm_cache_enabled and temperature == 0.0
+
+class LLMCache:
+    def __init__(self, path: str | None = None, ttl_s: int | None = None):
+        self.path = path or settings.db_path
+        self.ttl_s = settings.llm_cache_ttl_s if ttl_s is None else ttl_s
+        self.db = init_db(self.path, INIT_SQL)
+
+    async def get(self, key: str) -> Optional[str]:
+        def _t() -> Optional[str]:
+            with self.db.read() as c:
+                row = c.execute(
+                    "SELECT value FROM llm_cache WHERE key=? AND created_at>=?",
+                    (key, time() - self.ttl_s)
+                ).fetchone()
+                return row[0] if row else None
+        return await asyncio.to_thread(_t)
+
+    async def set(self, key: str, value: str):
+        def _t():
+            with self.db.write() as c:
+                c.execute(
+                    "INSERT OR REPLACE INTO llm_cache(key,value,created_at) VALUES(?,?,?)",
+                    (key, value, time())
+                )
+        await asyncio.to_thread(_t)
+
+_cache: Optional[LLMCache] = None
+
+def llm_cache() -> LLMCache:
+    """
+    Lazy-initialize the shared response cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+    return _cache
@@ -0,0 +1,59 @@
+# app/services/term_cache.py
+from __future__ import annotations
+import asyncio
+from typing import Dict, List, Optional
+from ..config import settings
+from ..stores.db import init_db
+
+INIT_SQL = """
+CREATE TABLE IF NOT EXISTS term_cache(
+  term     TEXT NOT NULL,
+  src_lang TEXT NOT NULL,
+  tgt_lang TEXT NOT NULL,
+  proposal TEXT NOT NULL,
+  PRIMARY KEY (term, src_lang, tgt_lang)
+);
+"""
+
+class TermCache:
+    """
+    Persistent (term, src_lang, tgt_lang) -> proposal cache shared by all clients/domains.
+    """
+    def __init__(self, path: str | None = None):
+        self.path = path or settings.db_path
+        self.db = init_db(self.path, INIT_SQL)
+
+    async def get_many(self, term: str, src_lang: str, tgt_langs: List[str]) -> Dict[str, str]:
+        if not settings.term_cache_enabled or not tgt_langs:
+            return {}
+        def _t() -> Dict[str, str]:
+            with self.db.read() as c:
+                marks = ",".join("?" * len(tgt_langs))
+                rows = c.execute(
+                    f"SELECT tgt_lang, proposal FROM term_cache WHERE term=? AND src_lang=? AND tgt_lang IN ({marks})",
+                    (term, src_lang, *tgt_langs)
+                ).fetchall()
+                return {lang: prop for lang, prop in rows}
+        return await asyncio.to_thread(_t)
+
+    async def set_many(self, term: str, src_lang: str, proposals: Dict[str, str]):
+        if not settings.term_cache_enabled or not proposals:
+            return
+        def _t():
+            with self.db.write() as c:
+                c.executemany(
+                    "INSERT OR REPLACE INTO term_cache(term,src_lang,tgt_lang,proposal) VALUES(?,?,?,?)",
+                    [(term, src_lang, lang, prop) for lang, prop in proposals.items()]
+                )
+        await asyncio.to_thread(_t)
+
+_cache: Optional[TermCache] = None
+
+def term_cache() -> TermCache:
+    """
+    Lazy-initialize the shared term cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = TermCache()
+    return _cache
@@ -1,5 +1,7 @@
 # app/services/terminology_service.py
 from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 import json
@@ -16,6 +18,24 @@ BANNED = {
     "fr": {},
     "de": {},
 }
+# minúsculas precalculadas: (forma original para el mensaje, forma comparable)
+_BANNED_LOWER = {
+    lang: {k: tuple((b, b.lower()) for b in bads) for k, bads in by_key.items()}
+    for lang, by_key in BANNED.items()
+}
+
+# JSON parseados por (ruta, mtime_ns, size): un cambio en el fichero cambia la clave
+_JSON_CACHE_MAX = 256
+_json_cache: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+
+_WORD_RE = re.compile(r"\w")
+
+@lru_cache(maxsize=128)
+def _glossary_pattern(keys_lower: Tuple[str, ...]) -> "re.Pattern[str]":
+    # una sola alternancia (más larga primero) en lookahead: prueba cada posición sin consumir,
+    # así los términos solapados ("capital call" dentro de "capital call notice") siguen contando
+    alt = "|".join(map(re.escape, sorted(keys_lower, key=len, reverse=True)))
+    return re.compile(r"(?<!\w)(?=(" + alt + r")(?!\w))")
 
 class TerminologyService:
     def __init__(self, base_dir: Optional[str] = None):
@@ -38,17 +58,30 @@ class TerminologyService:
             path.write_text("{}", encoding="utf-8")
 
     def _read_json(self, path: Path) -> Dict[str, str]:
-        if not path or not path.exists():
+        if not path:
+            return {}
+        try:
+            st = path.stat()
+        except FileNotFoundError:
             return {}
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        hit = _json_cache.get(key)
+        if hit is not None:
+            _json_cache.move_to_end(key)
+            return dict(hit)  # copia: upsert_terms muta el resultado
         with path.open("r", encoding="utf-8") as fh:
             try:
                 data = json.load(fh)
                 if not isinstance(data, dict):
-                    return {}
+                    data = {}
                 # normaliza claves a su forma exacta
-                return {str(k): str(v) for k, v in data.items()}
+                data = {str(k): str(v) for k, v in data.items()}
             except json.JSONDecodeError:
-                return {}
+                data = {}
+        _json_cache[key] = data
+        while len(_json_cache) > _JSON_CACHE_MAX:
+            _json_cache.popitem(last=False)
+        return dict(data)
 
     def _write_json(self, path: Path, data: Dict[str, str]):
         self._ensure_file(path)
@@ -80,11 +113,16 @@ class TerminologyService:
         self._ensure_file(target)
         existing = self._read_json(target)
         # valida prohibidos
-        lang_banned = BANNED.get(lang, {})
-        for k, v in terms.items():
-            for bad in lang_banned.get(k, []):
-                if bad.lower() in str(v).lower():
-                    raise ValueError(f"Traducción prohibida para {k!r}: contiene '{bad}'")
+        lang_banned = _BANNED_LOWER.get(lang, {})
+        if lang_banned:
+            for k, v in terms.items():
+                bads = lang_banned.get(k)
+                if not bads:
+                    continue
+                low = str(v).lower()
+                for bad, bad_low in bads:
+                    if bad_low in low:
+                        raise ValueError(f"Traducción prohibida para {k!r}: contiene '{bad}'")
         existing.update({str(k): str(v) for k, v in terms.items()})
         self._write_json(target, existing)
         return self.load_glossary(domain, lang, client)
@@ -101,12 +139,18 @@ class TerminologyService:
         glossary = data["merged"]
         keys = list(glossary.keys())
         matched = set()
-        lowered = text.lower()
+        by_lower: Dict[str, list] = {}
         for key in keys:
+            by_lower.setdefault(key.lower(), []).append(key)
+        if by_lower:
             # busca palabras completas; permite espacios en claves (p.ej. "capital call")
-            pat = r"(?<!\w)" + re.escape(key.lower()) + r"(?!\w)"
-            if re.search(pat, lowered, flags=re.IGNORECASE):
-                matched.add(key)
+            pat = _glossary_pattern(tuple(sorted(by_lower)))
+            for hit in {m.group(1) for m in pat.finditer(text.lower())}:
+                # en cada posición gana la clave más larga; las claves que son prefijo
+                # de ella y acaban en frontera de palabra también están presentes
+                for i in range(1, len(hit) + 1):
+                    if i == len(hit) or not _WORD_RE.match(hit, i):
+                        matched.update(by_lower.get(hit[:i], ()))
         total = len(keys) if keys else 1
         coverage = round(len(matched) / total, 4)
         return {
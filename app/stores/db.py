@@ -0,0 +1,83 @@
+# app/stores/db.py
+from __future__ import annotations
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
+# Ajustes por conexión (no persisten en el fichero): commits sin fsync completo en WAL,
+# temporales en memoria, ~64 MB de caché de páginas y lecturas vía mmap.
+# Las conexiones son persistentes, así que la caché de sentencias de sqlite3 (clave: texto SQL)
+# evita re-parsear las consultas repetidas; se amplía para que quepan todas las de los stores.
+_CACHED_STATEMENTS = 256
+_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """sqlite3.connect con los PRAGMAs de rendimiento aplicados."""
+    c = sqlite3.connect(path, check_same_thread=check_same_thread, cached_statements=_CACHED_STATEMENTS)
+    for pragma in _PRAGMAS:
+        c.execute(pragma)
+    return c
+
+class Database:
+    """
+    Conexiones persistentes a un fichero SQLite, compartidas por todos los stores que lo usan:
+    - una de escritura, serializada con un lock (SQLite admite un único escritor);
+    - una de lectura por hilo del executor (en WAL los lectores no se bloquean).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rw = connect(path, check_same_thread=False)
+        self._rw.execute("PRAGMA journal_mode=WAL")  # persistente en el fichero
+        self._local = threading.local()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura: commit al salir, rollback si hay excepción."""
+        with self._lock, self._rw:
+            yield self._rw
+
+    def read(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._local.conn = connect(self.path)
+        return c
+
+    def generation(self, table: str) -> int:
+        """Valor actual del contador de generation_sql(table) (última versión confirmada)."""
+        row = self.read().execute("SELECT gen FROM store_generation WHERE name=?", (table,)).fetchone()
+        return row[0] if row else 0
+
+def generation_sql(table: str) -> str:
+    """
+    Contador de escrituras de `table` mantenido por triggers en el propio fichero: lo ven todos los
+    procesos/workers que comparten la BD, así que sirve para invalidar cachés en memoria derivadas.
+    """
+    return f"""
+CREATE TABLE IF NOT EXISTS store_generation(name TEXT PRIMARY KEY, gen INTEGER NOT NULL DEFAULT 0);
+INSERT OR IGNORE INTO store_generation(name, gen) VALUES('{table}', 0);
+CREATE TRIGGER IF NOT EXISTS {table}_gen_ins AFTER INSERT ON {table}
+BEGIN UPDATE store_generation SET gen=gen+1 WHERE name='{table}'; END;
+CREATE TRIGGER IF NOT EXISTS {table}_gen_upd AFTER UPDATE ON {table}
+BEGIN UPDATE store_generation SET gen=gen+1 WHERE name='{table}'; END;
+CREATE TRIGGER IF NOT EXISTS {table}_gen_del AFTER DELETE ON {table}
+BEGIN UPDATE store_generation SET gen=gen+1 WHERE name='{table}'; END;
+"""
+
+@lru_cache(maxsize=None)
+def database(path: str) -> Database:
+    return Database(path)
+
+def init_db(path: str, script: str) -> Database:
+    """Crea el esquema y devuelve la Database compartida de `path`."""
+    db = database(path)
+    with db.write() as c:
+        c.executescript(script)
+    return db
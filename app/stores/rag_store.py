@@ -1,12 +1,16 @@
 from __future__ import annotations
-import sqlite3, asyncio, os
-from typing import List, Optional, Iterable
+from functools import lru_cache
+import asyncio, os, time
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, List, Optional, Iterable, Set, Tuple
 import yaml
 import trafilatura
 from ddgs import DDGS
 import numpy as np
 from ..config import settings
-from ..services.embeddings import embed_texts, cosine_sim
+from .db import generation_sql, init_db
+from ..services.embeddings import embed_texts, cosine_sim, stack_blobs, top_k, unit_rows, vec_to_blob
 
 INIT_SQL = """
 CREATE TABLE IF NOT EXISTS rag_sources(
@@ -26,93 +30,188 @@ CREATE TABLE IF NOT EXISTS rag_docs(
   vec BLOB
 );
 CREATE INDEX IF NOT EXISTS idx_rag_domain ON rag_docs(domain);
-"""
+CREATE INDEX IF NOT EXISTS idx_rag_client ON rag_docs(client_id);
+""" + generation_sql("rag_docs")
+
+@lru_cache(maxsize=8)
+def _trusted_hosts(raw: str) -> Tuple[str, ...]:
+    return tuple(d.strip().lower() for d in raw.split(",") if d.strip())
 
 def _trusted(url: str) -> bool:
-    allow = {d.strip().lower() for d in settings.rag_trusted_domains.split(",") if d.strip()}
-    return any(host and host in url.lower() for host in allow)
+    u = url.lower()
+    return any(d in u for d in _trusted_hosts(settings.rag_trusted_domains))
+
+# retrieve() cache: (path, generation, query, domain, client_id, topk) -> (stored_at, snippets).
+# The generation is the rag_docs write counter kept by triggers in the DB file (see db.generation_sql),
+# so writes from any process sharing the DB invalidate it; stale entries are never hit.
+_RETRIEVE_CACHE_MAX = 512
+_retrieve_cache: "OrderedDict[tuple, Tuple[float, List[str]]]" = OrderedDict()
+# Matriz de vectores por ámbito: (path, generation, domain, client_id, dim) -> (M, ids).
+# Los BLOBs son inmutables: sólo se re-leen tras un ingest (nueva generación). El `content`
+# no se cachea ni se lee para puntuar: sólo se recupera el de los top-k por id.
+_MATRIX_CACHE_MAX = 32
+_matrix_cache: "OrderedDict[tuple, Tuple[np.ndarray, List[int]]]" = OrderedDict()
 
 class RAGStore:
     def __init__(self, path: str | None = None):
         self.path = path or settings.db_path
-        with sqlite3.connect(self.path) as c:
-            c.executescript(INIT_SQL)
+        self.db = init_db(self.path, INIT_SQL)
 
     async def load_seed_sources(self, yaml_path: str = "data/seed/domains.yaml"):
         if not os.path.exists(yaml_path):
             return 0
         with open(yaml_path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
+        rows = [
+            (domain, it.get("title"), it.get("url"), it.get("year"), it.get("notes"))
+            for domain, items in data.items() for it in items
+        ]
         def _t():
-            with sqlite3.connect(self.path) as c:
-                for domain, items in data.items():
-                    for it in items:
-                        c.execute(
-                            "INSERT OR IGNORE INTO rag_sources(domain,title,url,year,notes) VALUES(?,?,?,?,?)",
-                            (domain, it.get("title"), it.get("url"), it.get("year"), it.get("notes"))
-                        )
+            with self.db.write() as c:
+                c.executemany(
+                    "INSERT OR IGNORE INTO rag_sources(domain,title,url,year,notes) VALUES(?,?,?,?,?)",
+                    rows
+                )
         await asyncio.to_thread(_t)
         return sum(len(v) for v in data.values())
 
+    def _ingested(self, urls: List[str], domain: str, client_id: Optional[str]) -> Set[str]:
+        if not urls:
+            return set()
+        with self.db.read() as c:
+            marks = ",".join("?" * len(urls))
+            rows = c.execute(
+                f"SELECT DISTINCT url FROM rag_docs WHERE domain IS ? AND client_id IS ? AND url IN ({marks})",
+                (domain, client_id, *urls)
+            ).fetchall()
+        return {r[0] for r in rows}
+
     async def ingest_urls(self, urls: Iterable[str], domain: str, client_id: Optional[str] = None) -> int:
+        # dedup (order-preserving) and skip URLs already ingested for this scope
+        pending = list(dict.fromkeys(u for u in urls if u))
+        done = await asyncio.to_thread(self._ingested, pending, domain, client_id)
+        sem = asyncio.Semaphore(settings.max_conc_fetch)
+
+        def _fetch(u: str) -> Optional[str]:
+            html = trafilatura.fetch_url(u, timeout=20, no_ssl=True)
+            if not html:
+                return None
+            text = trafilatura.extract(html, include_tables=False, include_comments=False)
+            return text[:12000] if text else None
+
+        async def _one(u: str) -> Optional[str]:
+            # fetch + extract are blocking: one worker thread per URL, bounded by sem
+            async with sem:
+                try:
+                    return await asyncio.to_thread(_fetch, u)
+                except Exception:
+                    return None
+
+        todo = [u for u in pending if u not in done]
+        fetched = await asyncio.gather(*[_one(u) for u in todo])
         texts, metas = [], []
-        for u in urls:
-            try:
-                html = trafilatura.fetch_url(u, timeout=20, no_ssl=True)
-                if not html: 
-                    continue
-                text = trafilatura.extract(html, include_tables=False, include_comments=False)
-                if not text:
-                    continue
-                texts.append(text[:12000])
+        for u, text in zip(todo, fetched):
+            if text:
+                texts.append(text)
                 metas.append((u, u))
-            except Exception:
-                continue
         if not texts:
             return 0
         vecs = await embed_texts(texts)
+        rows = [
+            (domain, client_id, u, title, content, vec_to_blob(vec))
+            for (u, title), vec, content in zip(metas, vecs, texts)
+        ]
         def _t():
-            with sqlite3.connect(self.path) as c:
-                for (u, title), vec, content in zip(metas, vecs, texts):
-                    c.execute(
-                        "INSERT OR IGNORE INTO rag_docs(domain,client_id,url,title,content,vec) VALUES(?,?,?,?,?,?)",
-                        (domain, client_id, u, title, content, vec.tobytes())
-                    )
+            # una sola transacción para todo el lote (commit al salir de write())
+            with self.db.write() as c:
+                c.executemany(
+                    "INSERT OR IGNORE INTO rag_docs(domain,client_id,url,title,content,vec) VALUES(?,?,?,?,?,?)",
+                    rows
+                )
         await asyncio.to_thread(_t)
         return len(texts)
 
     async def retrieve(self, query: str, domain: str, client_id: Optional[str], topk: int) -> List[str]:
+        ttl = settings.rag_cache_ttl_s
+        # generación compartida en la BD: escrituras de otros procesos/workers también invalidan
+        gen = await asyncio.to_thread(self.db.generation, "rag_docs")
+        key = (self.path, gen, query, domain, client_id, topk)
+        if ttl > 0:
+            hit = _retrieve_cache.get(key)
+            if hit and time.monotonic() - hit[0] < ttl:
+                _retrieve_cache.move_to_end(key)
+                return list(hit[1])
+        snippets = await self._retrieve(query, domain, client_id, topk, gen)
+        if ttl > 0:
+            _retrieve_cache[key] = (time.monotonic(), snippets)
+            _retrieve_cache.move_to_end(key)
+            while len(_retrieve_cache) > _RETRIEVE_CACHE_MAX:
+                _retrieve_cache.popitem(last=False)
+        return list(snippets)
+
+    async def _retrieve(self, query: str, domain: str, client_id: Optional[str], topk: int, gen: int) -> List[str]:
         qv = await embed_texts([query])
+        key = (self.path, gen, domain, client_id, qv.shape[1])
+        hit = _matrix_cache.get(key)
+        if hit is None:
+            def _load():
+                with self.db.read() as c:
+                    # dos búsquedas por índice en vez del OR entre columnas (scan completo);
+                    # la segunda excluye las filas del dominio para no duplicarlas
+                    rows = c.execute(
+                        "SELECT id, vec FROM rag_docs WHERE domain=? "
+                        "UNION ALL "
+                        "SELECT id, vec FROM rag_docs WHERE client_id=? AND NOT IFNULL(domain=?, 0)",
+                        (domain, client_id, domain)
+                    ).fetchall()
+                M, payloads = stack_blobs(rows, qv.shape[1])
+                return unit_rows(M), payloads  # normalizada una vez por build
+            hit = _matrix_cache[key] = await asyncio.to_thread(_load)
+            while len(_matrix_cache) > _MATRIX_CACHE_MAX:
+                _matrix_cache.popitem(last=False)
+        else:
+            _matrix_cache.move_to_end(key)
+        M, ids = hit
+        if not ids:
+            return []
         def _t():
-            with sqlite3.connect(self.path) as c:
-                rows = c.execute(
-                    "SELECT content, vec FROM rag_docs WHERE (domain=? OR (client_id IS NOT NULL AND client_id=?))",
-                    (domain, client_id)
-                ).fetchall()
-                if not rows:
-                    return []
-                contents = [r[0] for r in rows]
-                vecs = [np.frombuffer(r[1], dtype="float32") for r in rows if r[1]]
-                if not vecs:
-                    return []
-                M = np.vstack(vecs)
-                sims = cosine_sim(qv, M)[0]
-                order = np.argsort(-sims)[:topk]
-                return [contents[i][:1800] for i in order]
+            sims = cosine_sim(qv, M, b_unit=True)[0]
+            top = [ids[i] for i in top_k(sims, topk)]
+            with self.db.read() as c:
+                rows = dict(c.execute(
+                    f"SELECT id, substr(content, 1, 1800) FROM rag_docs WHERE id IN ({','.join('?' * len(top))})",
+                    top
+                ).fetchall())
+            return [rows[i] for i in top if i in rows]
         return await asyncio.to_thread(_t)
 
     async def web_backfill(self, query_terms: List[str], domain: str, client_id: Optional[str]) -> int:
-        urls: List[str] = []
-        try:
+        sem = asyncio.Semaphore(settings.max_conc_search)
+
+        def _search(q: str) -> List[str]:
             with DDGS() as ddgs:
-                for t in query_terms[:10]:
-                    q = f"{t} {domain} finance definition"
-                    for r in ddgs.text(q, max_results=settings.ddg_max_results):
-                        href = r.get("href")
-                        if href and (_trusted(href) or len(urls) < 3):
-                            urls.append(href)
-        except Exception:
-            return 0
+                return [r.get("href") for r in ddgs.text(q, max_results=settings.ddg_max_results)]
+
+        async def _hrefs(t: str) -> List[str]:
+            # DDGS is blocking: run each query in a worker thread, bounded by sem
+            async with sem:
+                try:
+                    return await asyncio.to_thread(_search, f"{t} {domain} finance definition")
+                except Exception:
+                    return []
+
+        hits = await asyncio.gather(*[_hrefs(t) for t in query_terms[:10]])
+        urls: Dict[str, None] = {}  # ordered set
+        for href in chain.from_iterable(hits):
+            if href and href not in urls and (_trusted(href) or len(urls) < 3):
+                urls[href] = None
         if not urls:
             return 0
         return await self.ingest_urls(urls, domain=domain, client_id=client_id)
+
+@lru_cache(maxsize=1)
+def rag_store() -> RAGStore:
+    """
+    Process-wide RAGStore on the default DB path (schema init runs once).
+    """
+    return RAGStore()
@@ -1,8 +1,10 @@
 from __future__ import annotations
-import sqlite3, json, asyncio
+from functools import lru_cache
+import json, asyncio
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
 from ..config import settings
+from .db import init_db
 
 @dataclass
 class GlossaryItem:
@@ -42,13 +44,50 @@ ON glossary(concept_key, lang);
 
 CREATE INDEX IF NOT EXISTS idx_glossary_client_domain
 ON glossary(client_id, domain);
+
+CREATE INDEX IF NOT EXISTS idx_glossary_lang_ck_lower
+ON glossary(lang, LOWER(concept_key));
+
+-- variants_json normalizado: una fila por variante en minúsculas (lookup por índice)
+CREATE TABLE IF NOT EXISTS glossary_variants(
+  variant_lc  TEXT NOT NULL,
+  lang        TEXT NOT NULL,
+  client_id   TEXT,
+  domain      TEXT,
+  concept_key TEXT NOT NULL,
+  PRIMARY KEY (variant_lc, lang, client_id, domain, concept_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_glossary_variants_concept
+ON glossary_variants(client_id, domain, concept_key, lang);
 """
 
+def _variant_rows(client_id, domain, concept_key: str, lang: str, variants) -> List[Tuple]:
+    return [(v, lang, client_id, domain, concept_key)
+            for v in sorted({str(x).strip().lower() for x in variants if x and str(x).strip()})]
+
 class TermStore:
     def __init__(self, path: str | None = None):
         self.path = path or settings.db_path
-        with sqlite3.connect(self.path) as c:
-            c.executescript(INIT_SQL)
+        self.db = init_db(self.path, INIT_SQL)
+        self._backfill_variants()
+
+    def _backfill_variants(self):
+        # bases anteriores a glossary_variants: se rellena una vez desde variants_json
+        with self.db.write() as c:
+            if c.execute("SELECT 1 FROM glossary_variants LIMIT 1").fetchone():
+                return
+            rows = c.execute(
+                "SELECT client_id, domain, concept_key, lang, variants_json FROM glossary "
+                "WHERE variants_json IS NOT NULL AND variants_json NOT IN ('', '[]')"
+            ).fetchall()
+            params: List[Tuple] = []
+            for cid, dom, ck, lang, vj in rows:
+                try:
+                    params.extend(_variant_rows(cid, dom, ck, lang, json.loads(vj)))
+                except Exception:
+                    continue
+            c.executemany("INSERT OR IGNORE INTO glossary_variants VALUES(?,?,?,?,?)", params)
 
     # -------- CRUD --------
     async def upsert_preferred(self, item: GlossaryItem):
@@ -56,7 +95,7 @@ class TermStore:
         Upsert preferred form; preserves existing variants_json.
         """
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.write() as c:
                 c.execute(
                     """INSERT OR REPLACE INTO glossary
                        (client_id,domain,concept_key,lang,preferred,variants_json)
@@ -75,7 +114,7 @@ class TermStore:
         Merge variants for a concept/lang at a given scope.
         """
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.write() as c:
                 row = c.execute(
                     "SELECT variants_json FROM glossary WHERE client_id IS ? "
                     "AND domain IS ? AND concept_key=? AND lang=?",
@@ -96,11 +135,17 @@ class TermStore:
                      client_id, domain, concept_key, lang,
                      json.dumps(sorted(vs), ensure_ascii=False))
                 )
+                # sólo se añaden filas: con client_id/domain NULL pueden coexistir varias filas
+                # del mismo concepto y sus variantes anteriores deben seguir encontrándose
+                c.executemany(
+                    "INSERT OR IGNORE INTO glossary_variants VALUES(?,?,?,?,?)",
+                    _variant_rows(client_id, domain, concept_key, lang, vs)
+                )
         await asyncio.to_thread(_t)
 
     async def add_dnt(self, item: DNTItem):
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.write() as c:
                 c.execute("INSERT OR IGNORE INTO dnt_client(client_id,term) VALUES(?,?)", (item.client_id, item.term))
         await asyncio.to_thread(_t)
 
@@ -109,7 +154,7 @@ class TermStore:
         Returns a dict: {"<DOMAIN or GLOBAL>::<concept_key>": {"en": "...", "fr": "...", ...}, ...}
         """
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.read() as c:
                 rows = c.execute(
                     "SELECT domain, concept_key, lang, preferred FROM glossary WHERE client_id=?",
                     (client_id,)
@@ -123,7 +168,7 @@ class TermStore:
 
     async def dnt_list(self, client_id: str) -> List[str]:
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.read() as c:
                 rows = c.execute("SELECT term FROM dnt_client WHERE client_id=?", (client_id,)).fetchall()
                 return [r[0] for r in rows]
         return await asyncio.to_thread(_t)
@@ -153,34 +198,37 @@ class TermStore:
             return None
         qkey_l = qkey.lower()
 
-        def _like_payload(x: str) -> str:
-            # crude but effective: look for `"term"` in the JSON string
-            return f'%"{x}"%'
-
         def _t() -> Optional[str]:
-            with sqlite3.connect(self.path) as c:
-                c.row_factory = sqlite3.Row
-                def one(cid, dom) -> Optional[str]:
-                    r = c.execute(
-                        """
-                        SELECT preferred
-                        FROM glossary
-                        WHERE client_id IS ? AND domain IS ? AND lang=?
-                          AND (
-                                LOWER(concept_key) = ?
-                             OR LOWER(variants_json) LIKE ?
-                          )
-                        LIMIT 1
-                        """,
-                        (cid, dom, lang, qkey_l, _like_payload(qkey_l))
-                    ).fetchone()
-                    return (r["preferred"] if r else None)
-
-                for cid, dom in [(client_id, domain), (client_id, None), (None, domain), (None, None)]:
-                    pref = one(cid, dom)
-                    if pref:
-                        return pref
-                return None
+            with self.db.read() as c:
+                # candidatos por concept_key o por variante (ambos vía índice); gana el ámbito más
+                # específico y, dentro de él, la fila más reciente
+                r = c.execute(
+                    """
+                    SELECT preferred FROM (
+                      SELECT g.preferred, g.client_id, g.domain, g.rowid AS rid
+                      FROM glossary g
+                      WHERE g.lang=? AND LOWER(g.concept_key)=?
+                      UNION ALL
+                      SELECT g.preferred, g.client_id, g.domain, g.rowid
+                      FROM glossary_variants v
+                      JOIN glossary g
+                        ON g.client_id IS v.client_id AND g.domain IS v.domain
+                       AND g.concept_key=v.concept_key AND g.lang=v.lang
+                      WHERE v.variant_lc=? AND v.lang=?
+                    )
+                    WHERE preferred<>''
+                      AND (client_id IS ? OR client_id IS NULL) AND (domain IS ? OR domain IS NULL)
+                    ORDER BY CASE
+                      WHEN client_id IS ? AND domain IS ? THEN 1
+                      WHEN client_id IS ? AND domain IS NULL THEN 2
+                      WHEN client_id IS NULL AND domain IS ? THEN 3
+                      ELSE 4 END, rid DESC
+                    LIMIT 1
+                    """,
+                    (lang, qkey_l, qkey_l, lang, client_id, domain,
+                     client_id, domain, client_id, domain)
+                ).fetchone()
+                return r[0] if r else None
 
         return await asyncio.to_thread(_t)
 
@@ -193,20 +241,48 @@ class TermStore:
         4) global (cross-domain)
         Returns the Jinja-ready block and a map {concept_key: preferred}.
         """
+        return (await self.glossary_blocks_multi(client_id, domain, [lang]))[lang]
+
+    async def glossary_blocks_multi(self, client_id: str, domain: str | None,
+                                    langs: List[str]) -> Dict[str, Tuple[str, Dict[str, str]]]:
+        """
+        glossary_block for several languages with one connection and one query.
+        Returns {lang: (block, {concept_key: preferred})}.
+        """
+        langs = list(dict.fromkeys(langs))
+
         def _t():
-            with sqlite3.connect(self.path) as c:
-                def fetch(cid, dom):
-                    return c.execute(
-                        "SELECT concept_key, preferred FROM glossary WHERE client_id IS ? "
-                        "AND domain IS ? AND lang=? AND preferred<>''",
-                        (cid, dom, lang)
-                    ).fetchall()
-
-                m: Dict[str, str] = {}
-                for cid, dom in [(client_id, domain), (client_id, None), (None, domain), (None, None)]:
-                    rows = fetch(cid, dom)
-                    for ck, pref in rows:
-                        m[ck] = pref  # override by priority
-                lines = [f"- {k}: {v}" for k, v in sorted(m.items())]
-                return "\n".join(lines), m
+            if not langs:
+                return {}
+            with self.db.read() as c:
+                marks = ",".join("?" * len(langs))
+                # one row per (lang, concept): the highest-priority scope wins inside SQLite
+                rows = c.execute(
+                    "SELECT lang, concept_key, preferred FROM ("
+                    " SELECT lang, concept_key, preferred, ROW_NUMBER() OVER ("
+                    "   PARTITION BY lang, concept_key ORDER BY CASE"
+                    "     WHEN client_id IS ? AND domain IS ? THEN 1"
+                    "     WHEN client_id IS ? AND domain IS NULL THEN 2"
+                    "     WHEN client_id IS NULL AND domain IS ? THEN 3"
+                    "     ELSE 4 END, rowid DESC) AS rn"
+                    " FROM glossary"
+                    f" WHERE lang IN ({marks}) AND preferred<>''"
+                    " AND (client_id IS ? OR client_id IS NULL) AND (domain IS ? OR domain IS NULL)"
+                    ") WHERE rn=1 ORDER BY lang, concept_key",
+                    (client_id, domain, client_id, domain, *langs, client_id, domain)
+                ).fetchall()
+            maps: Dict[str, Dict[str, str]] = {lang: {} for lang in langs}
+            for lang, ck, pref in rows:
+                maps[lang][ck] = pref
+            return {
+                lang: ("\n".join(f"- {k}: {v}" for k, v in m.items()), m)
+                for lang, m in maps.items()
+            }
         return await asyncio.to_thread(_t)
+
+@lru_cache(maxsize=1)
+def term_store() -> TermStore:
+    """
+    Process-wide TermStore on the default DB path (schema init runs once).
+    """
+    return TermStore()
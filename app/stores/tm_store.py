@@ -1,9 +1,12 @@
 from __future__ import annotations
-import sqlite3, asyncio
+from functools import lru_cache
+import asyncio
+from collections import OrderedDict
 from typing import Optional, List, Tuple
 import numpy as np
 from ..config import settings
-from ..services.embeddings import embed_texts, cosine_sim
+from .db import generation_sql, init_db
+from ..services.embeddings import embed_texts, cosine_sim, stack_blobs, top_k, unit_rows, vec_to_blob
 
 INIT_SQL = """
 CREATE TABLE IF NOT EXISTS tm_segments(
@@ -17,50 +20,109 @@ CREATE TABLE IF NOT EXISTS tm_segments(
   src_vec BLOB
 );
 CREATE INDEX IF NOT EXISTS idx_tm_client ON tm_segments(client_id);
-"""
+-- búsqueda por ámbito (cliente + par de idiomas): solo se leen los vectores candidatos
+CREATE INDEX IF NOT EXISTS idx_tm_scope ON tm_segments(client_id, src_lang, tgt_lang);
+""" + generation_sql("tm_segments")
+
+# Matriz de vectores por ámbito: (path, generation, client_id, src_lang, tgt_lang, dim) -> (M, ids).
+# La generación es el contador de escrituras de tm_segments que mantienen triggers en la BD
+# (db.generation_sql): lo ven todos los procesos, así que nunca se sirve una matriz obsoleta.
+# tgt_text no se lee para puntuar: sólo se recupera el de los top-k por id.
+_MATRIX_CACHE_MAX = 32
+_matrix_cache: "OrderedDict[tuple, Tuple[np.ndarray, List[int]]]" = OrderedDict()
 
 class TMStore:
     def __init__(self, path: str | None = None):
         self.path = path or settings.db_path
-        with sqlite3.connect(self.path) as c:
-            c.executescript(INIT_SQL)
+        self.db = init_db(self.path, INIT_SQL)
 
     async def upsert(self, client_id: str, src_lang: str, tgt_lang: str, domain: str, src_text: str, tgt_text: str):
-        vec = await embed_texts([src_text])
-        blob = vec.tobytes()
+        await self.upsert_many(client_id, src_lang, [(tgt_lang, domain, src_text, tgt_text)])
+
+    async def upsert_many(self, client_id: str, src_lang: str, rows: List[Tuple[str, str, str, str]]):
+        """
+        Batched insert of (tgt_lang, domain, src_text, tgt_text) rows:
+        one embedding call and one transaction for all of them.
+        """
+        if not rows:
+            return
+        # the same source segment is usually stored for several targets: embed it once
+        uniq = list(dict.fromkeys(r[2] for r in rows))
+        vecs = await embed_texts(uniq)
+        blobs = {src: vec_to_blob(vec) for src, vec in zip(uniq, vecs)}
+        params = [
+            (client_id, src_lang, tgt_lang, domain, src_text, tgt_text, blobs[src_text])
+            for (tgt_lang, domain, src_text, tgt_text) in rows
+        ]
         def _t():
-            with sqlite3.connect(self.path) as c:
-                c.execute(
+            with self.db.write() as c:
+                c.executemany(
                     "INSERT INTO tm_segments(client_id,src_lang,tgt_lang,domain,src_text,tgt_text,src_vec) VALUES(?,?,?,?,?,?,?)",
-                    (client_id, src_lang, tgt_lang, domain, src_text, tgt_text, blob)
+                    params
                 )
         await asyncio.to_thread(_t)
 
     async def search(self, client_id: str, src_text: str, src_lang: str, tgt_lang: str, topk: int = 1) -> List[Tuple[str, float]]:
-        vec = await embed_texts([src_text])
-        v = vec[0]
+        return (await self.search_many(client_id, [src_text], src_lang, tgt_lang, topk=topk))[0]
+
+    async def embed(self, src_texts: List[str]) -> np.ndarray:
+        """Source-side query vectors, reusable across target languages via search_many(src_vecs=...)."""
+        return await embed_texts(src_texts)
+
+    async def search_many(self, client_id: str, src_texts: List[str], src_lang: str, tgt_lang: str,
+                          topk: int = 1, src_vecs: Optional[np.ndarray] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Batched search: one embedding call and one scan of the TM rows for all texts.
+        Returns one hit list per input text, in input order.
+        Pass `src_vecs` (from embed) to skip the embedding call when searching several targets.
+        """
+        if not src_texts:
+            return []
+        Q = src_vecs if src_vecs is not None else await embed_texts(src_texts)
+        gen = await asyncio.to_thread(self.db.generation, "tm_segments")
+        key = (self.path, gen, client_id, src_lang, tgt_lang, Q.shape[1])
+        hit = _matrix_cache.get(key)
+        if hit is None:
+            def _load():
+                with self.db.read() as c:
+                    rows = c.execute(
+                        "SELECT id, src_vec FROM tm_segments WHERE client_id=? AND src_lang=? AND tgt_lang=?",
+                        (client_id, src_lang, tgt_lang)
+                    ).fetchall()
+                M, payloads = stack_blobs(rows, Q.shape[1])
+                return unit_rows(M), payloads  # normalizada una vez por build
+            hit = _matrix_cache[key] = await asyncio.to_thread(_load)
+            while len(_matrix_cache) > _MATRIX_CACHE_MAX:
+                _matrix_cache.popitem(last=False)
+        else:
+            _matrix_cache.move_to_end(key)
+        M, ids = hit
+        if not ids:
+            return [[] for _ in src_texts]
         def _t():
-            with sqlite3.connect(self.path) as c:
-                rows = c.execute(
-                    "SELECT tgt_text, src_vec FROM tm_segments WHERE client_id=? AND src_lang=? AND tgt_lang=?",
-                    (client_id, src_lang, tgt_lang)
-                ).fetchall()
-                vecs = []
-                tgts = []
-                for tgt, blob in rows:
-                    if blob:
-                        tgts.append(tgt)
-                        vecs.append(np.frombuffer(blob, dtype="float32"))
-                if not vecs:
-                    return []
-                M = np.vstack(vecs)
-                sims = cosine_sim(np.array([v]), M)[0]
-                order = np.argsort(-sims)[:topk]
-                return [(tgts[i], float(sims[i])) for i in order]
+            sims = cosine_sim(Q, M, b_unit=True)
+            tops = top_k(sims, topk)
+            want = list({ids[i] for order in tops for i in order})
+            with self.db.read() as c:
+                tgts = dict(c.execute(
+                    f"SELECT id, tgt_text FROM tm_segments WHERE id IN ({','.join('?' * len(want))})",
+                    want
+                ).fetchall())
+            out: List[List[Tuple[str, float]]] = []
+            for row, order in zip(sims, tops):
+                out.append([(tgts[ids[i]], float(row[i])) for i in order if ids[i] in tgts])
+            return out
         return await asyncio.to_thread(_t)
 
     async def clear_client(self, client_id: str):
         def _t():
-            with sqlite3.connect(self.path) as c:
+            with self.db.write() as c:
                 c.execute("DELETE FROM tm_segments WHERE client_id=?", (client_id,))
         await asyncio.to_thread(_t)
+
+@lru_cache(maxsize=1)
+def tm_store() -> TMStore:
+    """
+    Process-wide TMStore on the default DB path (schema init runs once).
+    """
+    return TMStore()
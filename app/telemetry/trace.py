@@ -1,17 +1,33 @@
 from __future__ import annotations
+from collections import deque
 from contextvars import ContextVar
-from typing import Any, Dict, List
-from time import time
+from typing import Any, Dict
+from time import perf_counter_ns, time
+
+MAX_EVENTS = 2048  # ring buffer: se conservan los últimos N eventos por traza
 
 _trace: ContextVar[Dict[str, Any] | None] = ContextVar("trace_ctx", default=None)
 
 def start(trace_id: str):
-    _trace.set({"trace_id": trace_id, "events": []})
+    _trace.set({
+        "trace_id": trace_id,
+        "events": deque(maxlen=MAX_EVENTS),
+        "t0_wall": time(),
+        "t0": perf_counter_ns(),
+    })
 
 def log(kind: str, **data):
     ctx = _trace.get()
     if ctx is not None:
-        ctx["events"].append({"ts": time(), "kind": kind, **data})
+        # tupla + reloj monotónico; el dict se construye sólo al exportar
+        ctx["events"].append((perf_counter_ns(), kind, data))
 
 def get() -> Dict[str, Any]:
-    return _trace.get() or {"trace_id": None, "events": []}
+    ctx = _trace.get()
+    if ctx is None:
+        return {"trace_id": None, "events": []}
+    t0_wall, t0 = ctx["t0_wall"], ctx["t0"]
+    return {
+        "trace_id": ctx["trace_id"],
+        "events": [{"ts": t0_wall + (ns - t0) / 1e9, "kind": kind, **data} for ns, kind, data in ctx["events"]],
+    }
@@ -0,0 +1,36 @@
+from __future__ import annotations
+import re
+from typing import List
+
+_PARA_RE = re.compile(r"\n\s*\n|\r\n\r\n")
+_SENT_RE = re.compile(r"(?<=[\.\!\?])\s+")
+
+def split_segments(text: str, max_chars: int = 1400) -> List[str]:
+    text = (text or "").strip()
+    # fast path: a paragraph break needs two newlines
+    if len(text) <= max_chars and text.count("\n") < 2:
+        return [text] if text else []
+    parts = _PARA_RE.split(text)
+    segs: List[str] = []
+    for p in parts:
+        p = p.strip()
+        if not p:
+            continue
+        if len(p) <= max_chars:
+            segs.append(p)
+        else:
+            buf: List[str] = []
+            buf_len = 0  # length of " ".join(buf)
+            for s in _SENT_RE.split(p):
+                add = len(s) + (1 if buf else 0)
+                if buf_len + add <= max_chars:
+                    buf.append(s)
+                    buf_len += add
+                else:
+                    if buf:
+                        segs.append(" ".join(buf))
+                    buf = [s]
+                    buf_len = len(s)
+            if buf:
+                segs.append(" ".join(buf))
+    return segs
@@ -1,8 +1,11 @@
 # app/utils/slug.py
 import re
+from functools import lru_cache
 
+# cualquier tramo de no-alfanuméricos (incluidos '_' repetidos) se colapsa en un solo '_'
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
 
+
+@lru_cache(maxsize=4096)
 def slugify(value: str) -> str:
-value = value.strip().lower()
-value = re.sub(r"[^a-z0-9]+", "_", value)
-return re.sub(r"_+", "_", value).strip("_")
\ No newline at end of file
+    return _NON_ALNUM_RE.sub("_", value.strip().lower()).strip("_")
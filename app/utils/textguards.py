@@ -1,23 +1,43 @@
 from __future__ import annotations
 import re
-from typing import Dict, Tuple, List
+from functools import lru_cache
+from typing import Dict, Tuple, List, Optional
 
-def mask(text: str, dnt: List[str]) -> Tuple[str, Dict[str, str]]:
-    if not dnt:
-        return text, {}
+_PLACEHOLDER_RE = re.compile(r"\[\[ENT_\d+\]\]")
+
+@lru_cache(maxsize=64)
+def _dnt_plan(dnt: Tuple[str, ...]) -> Tuple[Dict[str, str], Dict[str, str], Optional["re.Pattern[str]"]]:
+    # placeholders, mapa minúsculas->placeholder y alternancia compilada: una vez por lista DNT
+    # (los clientes reutilizan la suya en cada petición)
     mapping: Dict[str, str] = {}
-    masked = text
+    by_lower: Dict[str, str] = {}  # term.lower() -> placeholder (first/longest wins)
+    terms: List[str] = []
     for i, term in enumerate(sorted(set(dnt), key=len, reverse=True), start=1):
         if not term.strip():
             continue
         placeholder = f"[[ENT_{i}]]"
         mapping[placeholder] = term
-        # mask case-insensitive whole-word-ish
-        masked = re.sub(rf"\b{re.escape(term)}\b", placeholder, masked, flags=re.IGNORECASE)
-    return masked, mapping
+        if term.lower() not in by_lower:
+            by_lower[term.lower()] = placeholder
+            terms.append(term)
+    if not terms:
+        return mapping, by_lower, None
+    # alternancia más larga primero, sin distinguir mayúsculas, por palabra completa
+    pattern = re.compile(rf"\b(?:{'|'.join(map(re.escape, terms))})\b", re.IGNORECASE)
+    return mapping, by_lower, pattern
+
+def mask(text: str, dnt: List[str]) -> Tuple[str, Dict[str, str]]:
+    if not dnt:
+        return text, {}
+    mapping, by_lower, pattern = _dnt_plan(tuple(dnt))
+    if pattern is None:
+        return text, dict(mapping)
+    # one pass over the text
+    masked = pattern.sub(lambda m: by_lower.get(m.group(0).lower(), m.group(0)), text)
+    return masked, dict(mapping)
 
 def unmask(text: str, mapping: Dict[str, str]) -> str:
-    out = text
-    for ph, term in mapping.items():
-        out = out.replace(ph, term)
-    return out
+    if not mapping:
+        return text
+    # single scan for placeholders instead of one str.replace per entry
+    return _PLACEHOLDER_RE.sub(lambda m: mapping.get(m.group(0), m.group(0)), text)
@@ -1,57 +1,302 @@
-import asyncio, yaml, sys
+import argparse, asyncio, os, yaml, sys
+import orjson
+from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
-from app.pipelines.translate_graph import run_pipeline_graph
-from app.stores.term_store import TermStore, DNTItem
+from typing import Dict, List, Optional, Tuple
+from app.pipelines.translate_graph import run_pipeline_graph, run_pipeline_graph_batch
+from app.stores.term_store import TermStore, DNTItem, term_store
 
 THRESH_NUM = 1.0
 THRESH_TERM = 0.98
+DEFAULT_TARGETS = ("en", "fr", "de")
 
-def load_yaml(p: Path): 
-    return yaml.safe_load(p.read_text(encoding="utf-8"))
+# libyaml (C) si está disponible; mismo esquema "safe"
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# copia JSON de cada fixture ya parseado (entre ejecuciones): orjson.loads en vez de YAML
+_JSON_CACHE_DIR = Path(__file__).parent / ".fixture_cache"
+
+@lru_cache(maxsize=None)
+def _load_yaml_cached(path: str, mtime_ns: int):
+    p = Path(path)
+    j = _JSON_CACHE_DIR / (p.name + ".json")
+    try:
+        if j.stat().st_mtime_ns >= mtime_ns:
+            return orjson.loads(j.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        pass
+    data = yaml.load(p.read_text(encoding="utf-8"), Loader=_Loader)
+    try:
+        # sólo si el YAML es JSON puro (p.ej. sin fechas): que la copia no cambie tipos
+        raw = orjson.dumps(data)
+        if orjson.loads(raw) == data:
+            _JSON_CACHE_DIR.mkdir(exist_ok=True)
+            j.write_bytes(raw)
+    except (OSError, TypeError, orjson.JSONEncodeError):
+        pass
+    return data
+
+def _peek_keys(p: Path, keys: Tuple[str, ...]) -> dict:
+    """
+    Sólo las claves de primer nivel pedidas (p.ej. domain/tags), sin parsear el fixture completo:
+    se extraen sus líneas (la de la clave + las indentadas que la siguen) y se carga ese fragmento.
+    """
+    picked: List[str] = []
+    taking = False
+    with p.open(encoding="utf-8") as f:
+        for line in f:
+            if line[:1] not in (" ", "\t", "-", "#", "\n", ""):
+                taking = line.split(":", 1)[0].strip() in keys
+            if taking:
+                picked.append(line)
+    return yaml.load("".join(picked), Loader=_Loader) or {}
+
+def _selected(p: Path, args: argparse.Namespace) -> bool:
+    if args.match and not any(fnmatch(p.stem, m) or m in p.stem for m in args.match):
+        return False
+    if not (args.domain or args.tag):
+        return True
+    head = _peek_keys(p, ("domain", "tags"))
+    if args.domain and str(head.get("domain") or "").lower() not in {d.lower() for d in args.domain}:
+        return False
+    return not args.tag or bool(set(args.tag) & set(head.get("tags") or ()))
+
+class FixtureSchemaError(ValueError):
+    def __init__(self, path: Path, errors: List[str]):
+        self.path, self.errors = path, errors
+        super().__init__(f"{path.name}: " + "; ".join(errors))
+
+def _str_list(v) -> bool:
+    return isinstance(v, list) and all(isinstance(x, str) and x.strip() for x in v)
+
+def validate_fixture(path: Path, fx) -> None:
+    """Validación estructural en una pasada, antes de cualquier llamada LLM."""
+    if not isinstance(fx, dict):
+        raise FixtureSchemaError(path, ["top level must be a mapping"])
+    errors: List[str] = []
+    for key in ("client_id", "domain"):
+        if fx.get(key) is not None and not isinstance(fx[key], str):
+            errors.append(f"`{key}` must be a string")
+    if "targets" in fx and not (_str_list(fx["targets"]) and fx["targets"]):
+        errors.append("`targets` must be a non-empty list of language codes")
+    if "dnt" in fx and fx["dnt"] is not None and not _str_list(fx["dnt"]):
+        errors.append("`dnt` must be a list of strings")
+    glossary = fx.get("glossary")
+    if glossary is not None and not (isinstance(glossary, dict) and all(
+            isinstance(langs, dict) and all(isinstance(v, str) for v in langs.values())
+            for langs in glossary.values())):
+        errors.append("`glossary` must map concept -> {lang: preferred}")
+    cases = fx.get("cases")
+    if not isinstance(cases, list) or not cases:
+        errors.append("`cases` must be a non-empty list")
+    else:
+        for i, case in enumerate(cases):
+            if not isinstance(case, dict) or not isinstance(case.get("text"), str) or not case["text"].strip():
+                errors.append(f"cases[{i}]: `text` must be a non-empty string")
+            elif case.get("src_lang") is not None and not isinstance(case["src_lang"], str):
+                errors.append(f"cases[{i}]: `src_lang` must be a string")
+    if errors:
+        raise FixtureSchemaError(path, errors)
+
+def load_yaml(p: Path):
+    # memo por (path, mtime): sólo se re-parsea si el fichero cambia; se valida en cada carga
+    fx = _load_yaml_cached(str(p), p.stat().st_mtime_ns)
+    validate_fixture(p, fx)
+    return fx
 
 async def seed_from_fixture(ts: TermStore, fx: dict, client_id: str):
-    for concept_key, langs in fx.get("glossary", {}).items():
-        for lang, preferred in langs.items():
-            await ts.set_global_preferred(concept_key, lang, preferred)
-    for t in fx.get("dnt", []):
-        await ts.add_dnt(DNTItem(client_id=client_id, term=t))
-
-async def run_one_fixture(path: Path) -> bool:
-    from app.config import settings
-    ts = TermStore(settings.db_path)
+    # escrituras independientes: se lanzan juntas (TermStore las serializa en su conexión de escritura);
+    # cada fixture siembra siempre lo que declara, sin depender del orden de ejecución
+    glossary, dnt = fx.get("glossary") or {}, fx.get("dnt") or ()
+    await asyncio.gather(
+        *(ts.set_global_preferred(concept_key, lang, preferred)
+          for concept_key, langs in glossary.items()
+          for lang, preferred in langs.items()),
+        *(ts.add_dnt(DNTItem(client_id=client_id, term=t)) for t in dnt),
+    )
+
+async def prepare_fixture(path: Path, ts: TermStore) -> dict:
+    """Carga el fixture y siembra su glosario/DNT (etapa de E/S local)."""
     fx = load_yaml(path)
+    await seed_from_fixture(ts, fx, fx.get("client_id","qa_client"))
+    return fx
+
+def _qa_rows(res: dict, targets: Tuple[str, ...]) -> List[Tuple[str, float, float, bool]]:
+    """(target, numeric_consistency, term_coverage, ok) de un caso."""
+    rows = []
+    for L in targets:
+        qa = res["results"][L]["qa"]
+        num, term = qa["numeric_consistency"], qa["term_coverage"]
+        rows.append((L, num, term, num == THRESH_NUM and term >= THRESH_TERM))
+    return rows
+
+def _case_lines(path: Path, rows: List[Tuple[str, float, float, bool]]) -> List[str]:
+    # una línea por target, OK o FAIL
+    return [f"[{path.name}][{L}] num={num:.2f} term={term:.2f} -> {'OK' if ok else 'FAIL'}"
+            for L, num, term, ok in rows]
+
+async def check_fixture(path: Path, fx: dict, fail_fast: bool = False) -> bool:
+    """
+    Ejecuta los casos de un fixture ya sembrado y aplica los umbrales de QA (etapa de red).
+    Con fail_fast se comprueba cada caso al terminar y el primer fallo cancela los restantes.
+    """
     client_id = fx.get("client_id","qa_client")
-    await seed_from_fixture(ts, fx, client_id)
-    ok = True
-    for case in fx["cases"]:
-        res = await run_pipeline_graph(
-            text=case["text"],
-            client_id=client_id,
-            targets=fx.get("targets", ["en","fr","de"]),
-            src_lang_override=case.get("src_lang"),
-            domain_override=fx.get("domain"),
-            enable_rag=False,
-            save_tm=False
+    targets = tuple(fx.get("targets", DEFAULT_TARGETS))
+    domain = fx.get("domain")
+    cases = fx["cases"]
+    opts = dict(client_id=client_id, targets=list(targets), domain_override=domain,
+                enable_rag=False, save_tm=False)
+    # casos idénticos dentro del fixture: una sola ejecución, repartida a todos sus índices
+    # (sin memo entre fixtures: cada fixture responde sólo de sus propias ejecuciones)
+    where: Dict[Tuple[str, Optional[str]], List[int]] = {}
+    for i, case in enumerate(cases):
+        where.setdefault((case["text"], case.get("src_lang")), []).append(i)
+    uniq = list(where)
+    all_res: List[dict] = [{}] * len(cases)
+    if fail_fast:
+        tasks = {
+            asyncio.create_task(run_pipeline_graph(text=text, src_lang_override=src, **opts)): where[(text, src)]
+            for text, src in uniq
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    idx = tasks[t]
+                    res = t.result()
+                    for ci in idx:
+                        all_res[ci] = res
+                    rows = _qa_rows(res, targets)
+                    if not all(ok for *_, ok in rows):
+                        sys.stdout.write("\n".join(_case_lines(path, rows)) + "\n")
+                        return False
+        finally:
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    else:
+        # casos independientes en un único lote (la concurrencia real la acotan el limiter/semáforo de llm);
+        # la comprobación e impresión va después, en el orden del fixture
+        batch = await run_pipeline_graph_batch(
+            texts=[text for text, _ in uniq], src_lang_overrides=[src for _, src in uniq], **opts
         )
-        for L in fx.get("targets", ["en","fr","de"]):
-            qa = res["results"][L]["qa"]
-            n_ok = (qa["numeric_consistency"] == THRESH_NUM)
-            t_ok = (qa["term_coverage"] >= THRESH_TERM)
-            print(f"[{path.name}][{L}] num={qa['numeric_consistency']:.2f} term={qa['term_coverage']:.2f} -> {'OK' if (n_ok and t_ok) else 'FAIL'}")
-            ok = ok and n_ok and t_ok
-    return ok
-
-async def main():
+        for key, res in zip(uniq, batch):
+            for ci in where[key]:
+                all_res[ci] = res
+    per_case = [_qa_rows(res, targets) for res in all_res]
+    # informe del fixture en una sola escritura: sin intercalarse con otros fixtures en paralelo
+    lines = [line for rows in per_case for line in _case_lines(path, rows)]
+    n_ok = sum(ok for rows in per_case for *_, ok in rows)
+    n_all = sum(len(rows) for rows in per_case)
+    mean_term = sum(term for rows in per_case for _, _, term, _ in rows) / n_all if n_all else 0
+    lines.append(f"[{path.name}] {n_ok}/{n_all} OK, mean term={mean_term:.2f}")
+    sys.stdout.write("\n".join(lines) + "\n")
+    return n_ok == n_all
+
+async def run_one_fixture(path: Path, ts: TermStore, fail_fast: bool = False) -> bool:
+    return await check_fixture(path, await prepare_fixture(path, ts), fail_fast)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Regression fixtures (QA numérica + cobertura terminológica)")
+    ap.add_argument("--fail-fast", action="store_true", help="stop a fixture at its first failing case and cancel the remaining fixtures")
+    ap.add_argument("--workers", type=int, default=8, help="fixtures executing at once")
+    ap.add_argument("--queue", type=int, default=8, help="prepared fixtures waiting for a worker")
+    ap.add_argument("--match", action="append", default=[], help="fixture name substring or glob (repeatable)")
+    ap.add_argument("--domain", action="append", default=[], help="only fixtures with this domain (repeatable)")
+    ap.add_argument("--tag", action="append", default=[], help="only fixtures listing this tag in `tags` (repeatable)")
+    return ap.parse_args(argv)
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
     fx_dir = Path(__file__).parent / "fixtures"
+    ts = term_store()  # singleton del proceso (MT_DB_PATH): compartido por todos los fixtures
+    # filtros CLI: el nombre no requiere leer el fichero; domain/tags sólo miran esas claves
+    # scandir: el tipo de entrada viene del propio listado (sin stat por fichero)
+    found = sorted(
+        e.path for e in os.scandir(fx_dir)
+        if e.name.endswith(".yaml") and not e.name.startswith(".") and e.is_file()
+    )
+    paths = [p for p in map(Path, found) if _selected(p, args)]
+    if not paths:
+        print("No fixtures selected", file=sys.stderr)
+        return 1
+
+    # productor (carga + siembra) -> cola acotada -> workers (pipeline + QA) -> resultados:
+    # la E/S local se solapa con las llamadas LLM y sólo hay `--queue` fixtures preparados en memoria.
+    # Cada fallo se informa en cuanto su fixture termina, no al final del lote.
+    n_workers = max(1, min(args.workers, len(paths)))
+    jobs: "asyncio.Queue[Optional[Tuple[Path, dict]]]" = asyncio.Queue(maxsize=max(1, args.queue))
+    results: "asyncio.Queue[Tuple[Path, bool]]" = asyncio.Queue()
+
+    async def producer():
+        for p in paths:
+            try:
+                fx = await prepare_fixture(p, ts)
+            except FixtureSchemaError as e:
+                # fixture mal formado: fallo inmediato, sin sembrar ni llamar al pipeline
+                print(f"[{p.name}] INVALID: {'; '.join(e.errors)}", file=sys.stderr)
+                results.put_nowait((p, False))
+                continue
+            except Exception as e:
+                print(f"[{p.name}] ERROR: {e!r}", file=sys.stderr)
+                results.put_nowait((p, False))
+                continue
+            await jobs.put((p, fx))
+        for _ in range(n_workers):
+            await jobs.put(None)
+
+    async def worker():
+        while (job := await jobs.get()) is not None:
+            p, fx = job
+            try:
+                ok = await check_fixture(p, fx, args.fail_fast)
+            except Exception as e:
+                print(f"[{p.name}] ERROR: {e!r}", file=sys.stderr)
+                ok = False
+            results.put_nowait((p, ok))
+
+    tasks = [asyncio.create_task(producer()), *(asyncio.create_task(worker()) for _ in range(n_workers))]
     failures = 0
-    for p in sorted(fx_dir.glob("*.yaml")):
-        ok = await run_one_fixture(p)
-        if not ok:
-            failures += 1
+    try:
+        for _ in paths:
+            p, ok = await results.get()
+            if not ok:
+                failures += 1
+                print(f"[{p.name}] FAILED", file=sys.stderr)
+                if args.fail_fast:
+                    break
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     if failures:
         print(f"\nFAILED fixtures: {failures}", file=sys.stderr)
-        sys.exit(1)
+        return 1
     print("\nAll fixtures passed ✓")
+    return 0
+
+def _loop_factory():
+    # uvloop (opcional) si está instalado: menos overhead por await; si no, el loop estándar
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+def run(argv=None, runner: "Optional[asyncio.Runner]" = None) -> int:
+    """
+    Ejecuta main() y devuelve el código de salida. Un harness que invoque el runner varias veces
+    puede pasar su propio asyncio.Runner abierto (Python 3.11+): se reutilizan loop, executor por
+    defecto y los recursos ligados al loop (semáforos/limiters de llm, micro-batcher de embeddings).
+    """
+    if runner is not None:
+        return runner.run(main(argv))
+    if not hasattr(asyncio, "Runner"):
+        # Python < 3.11: sin Runner ni loop_factory, loop estándar
+        return asyncio.run(main(argv))
+    with asyncio.Runner(loop_factory=_loop_factory()) as own:
+        return own.run(main(argv))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(run())
@@ -0,0 +1,49 @@
+import asyncio
+from app.agents import term_translator as TT
+from app.pipelines import glossary_resolver as GR
+from app.services import term_cache as TC
+from app.stores.term_store import TermStore
+from app.config import settings
+
+def run(coro):
+    return asyncio.run(coro)
+
+class _Rag:
+    async def web_backfill(self, *a, **k):
+        return 0
+
+def _setup(tmp_path, monkeypatch, answers):
+    """answers: propuestas devueltas por el LLM en orden; el juez sólo acepta las que empiezan por 'good'."""
+    calls = []
+    async def fake_llm(prompt, *, model, schema, temperature):
+        prop = answers[len(calls)]
+        calls.append(prompt)
+        return TT.MultiTermProposal(term="x", src_lang="en", proposals=[TT.LangProposal(lang="fr", proposal=prop)])
+    async def fake_judge(source, src_lang, proposals):
+        return {L: (0.9 if p.startswith("good") else 0.1) for L, p in proposals.items()}
+    monkeypatch.setattr(TT, "llm_parse", fake_llm)
+    monkeypatch.setattr(GR, "judge_term_quality_multi", fake_judge)
+    monkeypatch.setattr(TC, "_cache", TC.TermCache(str(tmp_path / "t.sqlite")))
+    monkeypatch.setattr(settings, "term_cache_enabled", True)
+    monkeypatch.setattr(settings, "term_quality_min", 0.75)
+    return calls, TermStore(str(tmp_path / "t.sqlite"))
+
+def _ensure(ts, client_id="acme"):
+    return run(GR.ensure_concept_prefs(
+        ts, _Rag(), client_id=client_id, domain="PE", concept_key="zz carry", source_surface="zz carry",
+        src_lang="en", tgt_langs=["fr"], enable_rag=True,
+    ))
+
+def test_weak_proposal_is_not_cached_and_retry_reaches_llm(tmp_path, monkeypatch):
+    calls, ts = _setup(tmp_path, monkeypatch, ["weak form", "good form"])
+    assert _ensure(ts) == {"fr": "good form"}
+    assert len(calls) == 2  # la reintentona no se sirve desde la caché
+    assert run(TC.term_cache().get_many("zz carry", "en", ["fr"])) == {"fr": "good form"}
+
+def test_still_weak_proposal_stays_out_of_cache(tmp_path, monkeypatch):
+    calls, ts = _setup(tmp_path, monkeypatch, ["weak form", "weak again", "good form"])
+    assert _ensure(ts) == {"fr": "weak again"}
+    assert run(TC.term_cache().get_many("zz carry", "en", ["fr"])) == {}
+    # otro cliente vuelve a proponer en vez de heredar la forma rechazada
+    assert _ensure(ts, client_id="beta") == {"fr": "good form"}
+    assert len(calls) == 3
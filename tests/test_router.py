@@ -0,0 +1,19 @@
+import asyncio
+from app.agents import router as R
+
+def test_decide_domain_llm_fallback_memoized(monkeypatch):
+    calls = []
+    async def fake_llm(prompt, model, temperature=0.0):
+        calls.append(prompt)
+        return "Real Estate"
+    monkeypatch.setattr(R, "llm_text", fake_llm)
+    monkeypatch.setattr(R, "_domain_memo", type(R._domain_memo)())
+    text = "Quarterly letter to investors about the portfolio."  # sin señales de palabras clave
+    assert asyncio.run(R.decide_domain(text, hint=None)) == "Real Estate"
+    assert asyncio.run(R.decide_domain(text, hint=None)) == "Real Estate"
+    assert len(calls) == 1
+    assert asyncio.run(R.decide_domain(text + " Second edition.", hint=None)) == "Real Estate"
+    assert len(calls) == 2
+    # hint y palabras clave no pasan por el LLM
+    assert asyncio.run(R.decide_domain(text, hint="tax")) == "Fiscal/Tax"
+    assert len(calls) == 2
@@ -0,0 +1,91 @@
+import asyncio, sqlite3
+import numpy as np
+import pytest
+from app.stores import rag_store as RS, tm_store as TS
+from app.services.embeddings import vec_to_blob
+from app.config import settings
+
+_DIM = 8
+
+async def _fake_embed(texts):
+    # vectores deterministas por texto: textos iguales -> coseno 1
+    rows = [np.random.default_rng(abs(hash(t)) % 2**32).standard_normal(_DIM) for t in texts]
+    return np.array(rows, dtype="float32")
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    monkeypatch.setattr(TS, "embed_texts", _fake_embed)
+    monkeypatch.setattr(RS, "embed_texts", _fake_embed)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def _blob(text: str) -> bytes:
+    return vec_to_blob(run(_fake_embed([text]))[0])
+
+def test_tm_search_sees_own_and_foreign_writes(tmp_path, fake_embed):
+    tm = TS.TMStore(str(tmp_path / "tm.sqlite"))
+    assert run(tm.search("acme", "hello world", "en", "fr")) == []
+
+    run(tm.upsert_many("acme", "en", [("fr", "PE", "hello world", "bonjour le monde"),
+                                       ("de", "PE", "hello world", "hallo Welt")]))
+    [(txt, score)] = run(tm.search("acme", "hello world", "en", "fr"))
+    assert txt == "bonjour le monde" and score == pytest.approx(1.0, abs=1e-2)
+
+    # escritura desde otra conexión (otro proceso/worker): la generación cambia y la matriz se recarga
+    with sqlite3.connect(tm.path) as c:
+        c.execute(
+            "INSERT INTO tm_segments(client_id,src_lang,tgt_lang,domain,src_text,tgt_text,src_vec) "
+            "VALUES('acme','en','fr','PE','good morning','bonjour',?)", (_blob("good morning"),)
+        )
+    assert run(tm.search("acme", "good morning", "en", "fr"))[0][0] == "bonjour"
+
+    with sqlite3.connect(tm.path) as c:
+        c.execute("DELETE FROM tm_segments WHERE tgt_text='bonjour'")
+    assert [t for t, _ in run(tm.search("acme", "good morning", "en", "fr", topk=5))] == ["bonjour le monde"]
+
+    run(tm.clear_client("acme"))
+    assert run(tm.search_many("acme", ["hello world"], "en", "de")) == [[]]
+
+def test_tm_search_many_reuses_src_vecs(tmp_path, fake_embed):
+    tm = TS.TMStore(str(tmp_path / "tm.sqlite"))
+    run(tm.upsert_many("acme", "en", [("fr", "PE", "a", "A"), ("fr", "PE", "b", "B")]))
+    Q = run(tm.embed(["b", "a"]))
+    hits = run(tm.search_many("acme", ["b", "a"], "en", "fr", src_vecs=Q))
+    assert [h[0][0] for h in hits] == ["B", "A"]
+
+def test_rag_retrieve_invalidated_by_writes(tmp_path, fake_embed, monkeypatch):
+    monkeypatch.setattr(settings, "rag_cache_ttl_s", 300.0)
+    rag = RS.RAGStore(str(tmp_path / "rag.sqlite"))
+    assert run(rag.retrieve("hello", "PE", "acme", 3)) == []
+
+    # aunque la consulta ya está en la caché de retrieve, una escritura externa la invalida
+    with sqlite3.connect(rag.path) as c:
+        c.execute("INSERT INTO rag_docs(domain,client_id,url,title,content,vec) VALUES('PE','acme','u','t','hello',?)",
+                  (_blob("hello"),))
+    assert run(rag.retrieve("hello", "PE", "acme", 3)) == ["hello"]
+
+    with sqlite3.connect(rag.path) as c:
+        c.execute("INSERT INTO rag_docs(domain,client_id,url,title,content,vec) VALUES('RE','acme','u2','t','other',?)",
+                  (_blob("other"),))
+    # ámbito por cliente fuera del dominio; orden por similitud
+    assert run(rag.retrieve("hello", "PE", "acme", 3)) == ["hello", "other"]
+    assert run(rag.retrieve("hello", "PE", "beta", 3)) == ["hello"]
+
+    with sqlite3.connect(rag.path) as c:
+        c.execute("DELETE FROM rag_docs")
+    assert run(rag.retrieve("hello", "PE", "acme", 3)) == []
+
+def test_generation_counts_committed_writes(tmp_path):
+    db = TS.TMStore(str(tmp_path / "tm.sqlite")).db
+    g0 = db.generation("tm_segments")
+    with db.write() as c:
+        c.execute("INSERT INTO tm_segments(client_id,src_lang,tgt_lang,src_text,tgt_text) VALUES('a','en','fr','x','y')")
+        c.execute("UPDATE tm_segments SET tgt_text='z'")
+    assert db.generation("tm_segments") == g0 + 2
+    with pytest.raises(RuntimeError):
+        with db.write() as c:
+            c.execute("DELETE FROM tm_segments")
+            raise RuntimeError
+    assert db.generation("tm_segments") == g0 + 2  # rollback: sin cambio
+    assert db.generation("missing") == 0
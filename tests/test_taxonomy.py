@@ -0,0 +1,10 @@
+from app.domain.taxonomy import keyword_domain
+
+def test_keyword_domain_counts_distinct_cues():
+    # una palabra genérica repetida no basta para saltarse el LLM
+    assert keyword_domain("The REIT reported NOI growth; property taxes and VAT on rents rose, "
+                          "and tax depreciation was lower.") is None
+    assert keyword_domain("VAT VAT VAT VAT on every invoice.") is None
+    assert keyword_domain("Withholding rates under the tax treaty and transfer pricing rules (BEPS) apply.") == "Fiscal/Tax"
+    assert keyword_domain("The buyout fund closed; IRR and TVPI rose while capital calls slowed.") == "Private Equity"
+    assert keyword_domain("") is None
@@ -0,0 +1,115 @@
+import asyncio, json, sqlite3
+from app.stores.term_store import TermStore, GlossaryItem
+from app.services.term_cache import TermCache
+from app.config import settings
+
+def run(coro):
+    return asyncio.run(coro)
+
+def _seed_scopes(ts: TermStore):
+    # mismo concepto en los cuatro ámbitos; cada uno debe ganar solo cuando es el más específico
+    for cid, dom, pref in [
+        (None, None, "global"),
+        (None, "PE", "global+domain"),
+        ("acme", None, "client"),
+        ("acme", "PE", "client+domain"),
+    ]:
+        run(ts.upsert_preferred(GlossaryItem(cid, dom, "carried interest", "fr", pref)))
+
+def test_glossary_scope_priority(tmp_path):
+    ts = TermStore(str(tmp_path / "t.sqlite"))
+    _seed_scopes(ts)
+    pick = lambda cid, dom: run(ts.glossary_block(cid, dom, "fr"))[1]["carried interest"]
+    assert pick("acme", "PE") == "client+domain"
+    assert pick("acme", "RE") == "client"
+    assert pick("other", "PE") == "global+domain"
+    assert pick("other", "RE") == "global"
+
+def test_glossary_blocks_multi_one_row_per_concept(tmp_path):
+    ts = TermStore(str(tmp_path / "t.sqlite"))
+    _seed_scopes(ts)
+    run(ts.set_global_preferred("NAV", "de", "NIW"))
+    run(ts.upsert_preferred(GlossaryItem("acme", "PE", "NAV", "fr", "")))  # vacío: no cuenta
+    run(ts.set_global_preferred("NAV", "fr", "VL"))
+    out = run(ts.glossary_blocks_multi("acme", "PE", ["fr", "de", "fr"]))
+    assert set(out) == {"fr", "de"}
+    block, m = out["fr"]
+    assert m == {"NAV": "VL", "carried interest": "client+domain"}
+    assert block == "- NAV: VL\n- carried interest: client+domain"
+    assert out["de"][1] == {"NAV": "NIW"}
+
+def test_glossary_global_duplicates_latest_wins(tmp_path):
+    # NULL no choca en la PK: dos filas globales del mismo concepto conviven; gana la más reciente
+    ts = TermStore(str(tmp_path / "t.sqlite"))
+    run(ts.set_global_preferred("IRR", "fr", "TRI (old)"))
+    run(ts.set_global_preferred("IRR", "fr", "TRI"))
+    assert run(ts.glossary_block("acme", None, "fr"))[1] == {"IRR": "TRI"}
+    assert run(ts.find_preferred_fuzzy("acme", None, "fr", "irr")) == "TRI"
+
+def test_find_preferred_fuzzy_variants(tmp_path):
+    ts = TermStore(str(tmp_path / "t.sqlite"))
+    _seed_scopes(ts)
+    run(ts.add_variants("carried interest", "fr", ["Carry", "intéressement"], client_id="acme", domain="PE"))
+    run(ts.add_variants("carried interest", "fr", ["carry"]))
+    # concept_key sin distinguir mayúsculas
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "fr", "Carried Interest")) == "client+domain"
+    # variante del ámbito del cliente
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "fr", "CARRY")) == "client+domain"
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "fr", "intéressement")) == "client+domain"
+    # otro cliente: solo la variante global es visible
+    assert run(ts.find_preferred_fuzzy("other", None, "fr", "carry")) == "global"
+    assert run(ts.find_preferred_fuzzy("other", None, "fr", "intéressement")) is None
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "de", "carry")) is None
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "fr", "  ")) is None
+
+def test_add_variants_keeps_earlier_variants(tmp_path):
+    ts = TermStore(str(tmp_path / "t.sqlite"))
+    run(ts.set_global_preferred("NAV", "fr", "VL"))
+    run(ts.add_variants("NAV", "fr", ["valeur liquidative"]))
+    run(ts.add_variants("NAV", "fr", ["VNI"]))
+    with ts.db.read() as c:
+        rows = c.execute("SELECT variant_lc FROM glossary_variants ORDER BY 1").fetchall()
+    assert rows == [("valeur liquidative",), ("vni",)]
+    assert run(ts.find_preferred_fuzzy(None, None, "fr", "vni")) == "VL"
+    assert run(ts.find_preferred_fuzzy(None, None, "fr", "Valeur Liquidative")) == "VL"
+
+def test_backfill_variants_from_legacy_db(tmp_path):
+    # base anterior a glossary_variants: solo variants_json
+    path = str(tmp_path / "legacy.sqlite")
+    with sqlite3.connect(path) as c:
+        c.execute(
+            "CREATE TABLE glossary(client_id TEXT, domain TEXT, concept_key TEXT NOT NULL, lang TEXT NOT NULL, "
+            "preferred TEXT NOT NULL, variants_json TEXT DEFAULT '[]', "
+            "PRIMARY KEY (client_id, domain, concept_key, lang))"
+        )
+        c.executemany("INSERT INTO glossary VALUES(?,?,?,?,?,?)", [
+            ("acme", "PE", "carried interest", "fr", "intéressement", json.dumps(["Carry", " carry ", ""])),
+            (None, None, "NAV", "fr", "VL", "[]"),
+            (None, None, "IRR", "fr", "TRI", "not json"),
+        ])
+    ts = TermStore(path)
+    with ts.db.read() as c:
+        rows = c.execute("SELECT * FROM glossary_variants").fetchall()
+    assert rows == [("carry", "fr", "acme", "PE", "carried interest")]
+    assert run(ts.find_preferred_fuzzy("acme", "PE", "fr", "Carry")) == "intéressement"
+
+    # al reabrir no se vuelve a rellenar ni se duplican filas
+    TermStore(path)
+    with ts.db.read() as c:
+        assert c.execute("SELECT COUNT(*) FROM glossary_variants").fetchone()[0] == 1
+
+def test_term_cache_overwrite_and_toggle(tmp_path, monkeypatch):
+    tc = TermCache(str(tmp_path / "t.sqlite"))
+    monkeypatch.setattr(settings, "term_cache_enabled", True)
+    run(tc.set_many("NAV", "en", {"fr": "VL", "de": "NIW"}))
+    assert run(tc.get_many("NAV", "en", ["fr", "de", "es"])) == {"fr": "VL", "de": "NIW"}
+    # una nueva propuesta reemplaza la anterior
+    run(tc.set_many("NAV", "en", {"fr": "valeur liquidative"}))
+    assert run(tc.get_many("NAV", "en", ["fr"])) == {"fr": "valeur liquidative"}
+    assert run(tc.get_many("NAV", "es", ["fr"])) == {}
+
+    monkeypatch.setattr(settings, "term_cache_enabled", False)
+    assert run(tc.get_many("NAV", "en", ["fr"])) == {}
+    run(tc.set_many("IRR", "en", {"fr": "TRI"}))
+    monkeypatch.setattr(settings, "term_cache_enabled", True)
+    assert run(tc.get_many("IRR", "en", ["fr"])) == {}